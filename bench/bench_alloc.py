@@ -0,0 +1,194 @@
+# CPython check: the steady-state update paths keep no memory per iteration
+#
+# Run from the repository root:  python bench/bench_alloc.py [--rounds 500]
+#
+# Runs each hot path (an RP poll through FetchEngine, a sensor pass, a
+# sparkline column, an unchanged label update) until it is warm, then
+# measures with tracemalloc how much memory is still held after many
+# more rounds.  Memory held per round grows for as long as the board
+# runs; the script then exits with status 1, so it can gate a change.
+# The bytes allocated per round are shown too: they do not fail the
+# check, but they are what the garbage collector has to clean up.
+#
+# SPDX-License-Identifier: MIT
+import os
+import gc
+import sys
+import asyncio
+import argparse
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(1, os.path.join(os.path.dirname(HERE), "sim"))
+
+from fetch import FetchEngine  # noqa: E402
+from render import ViewModel  # noqa: E402
+from sensors import Sampler, Series, Sparkline  # noqa: E402
+
+WARMUP = 50
+# a leak keeps at least one object (16 bytes or more) per round; below
+# one byte a round is the interpreter's own free lists settling
+LEAK_BYTES = 1
+RP_PATHS = tuple(f"song[{i}].{name}" for i in range(4)
+                 for name in ("title", "artist", "album", "sched_time_millis", "duration"))
+
+
+class _Response:
+    """ an adafruit_requests Response over a body held in memory """
+
+    def __init__(self, body):
+        self.status_code = 200
+        self.headers = {}
+        self.socket = True
+        self._body = memoryview(body)
+        self._at = 0
+
+    def _readinto(self, buf):
+        count = min(len(buf), len(self._body) - self._at)
+        buf[:count] = self._body[self._at:self._at + count]
+        self._at += count
+        return count
+
+    def close(self):
+        self.socket = None
+
+
+class _Pool:
+    """ the parts of ConnectionPool FetchEngine uses """
+
+    def __init__(self, body):
+        self.body = body
+
+    def get(self, url, **kwargs):
+        return _Response(self.body)
+
+    def drop(self, host):
+        pass
+
+    def reset(self):
+        pass
+
+
+class _Label:
+    text = ""
+
+
+class _DeviceBuffer(bytearray):
+    """ a bytearray without the methods CircuitPython's lacks, so a parser
+    relying on them fails here as it would on the board """
+
+    def __getattribute__(self, name):
+        if name in ("find", "index", "rfind", "count"):
+            raise AttributeError(f"'bytearray' object has no attribute '{name}'")
+        return super().__getattribute__(name)
+
+
+def fetch_round():
+    with open(os.path.join(HERE, "payloads", "rp_nowplaying.json"), "rb") as f:
+        engine = FetchEngine(_Pool(f.read()))
+    engine._buffer = _DeviceBuffer(engine.chunk_size)
+    engine._view = memoryview(engine._buffer)
+    loop = asyncio.new_event_loop()
+    url = "https://api.radioparadise.com/api/nowplaying_list_v2022?chan=0&list_num=4"
+
+    def poll():
+        if not loop.run_until_complete(engine.get_fields(url, RP_PATHS, "bench")):
+            raise RuntimeError("no fields extracted")
+    return poll
+
+
+def sensor_round():
+    clock = [0.0]
+    light = Series("light", lambda: 20000, 1)
+    temp = Series("temp", lambda: 71.5, 10)
+    line = Sparkline(60, 24, 0, 65535)
+    light.on_minute = line.push
+    sampler = Sampler((light, temp))
+
+    def poll():
+        clock[0] += 1
+        for series in sampler.series:
+            series.add(series.read(), clock[0])
+        sampler.reads += 1
+    return poll
+
+
+def sparkline_round():
+    line = Sparkline(60, 24, 0, 100)
+    values = [0]
+
+    def push():
+        values[0] = (values[0] + 7) % 100
+        line.push(values[0])
+    return push
+
+
+def label_round():
+    view = ViewModel()
+    label = _Label()
+    reading = (None, 20224, 71)
+    text = "Touch: {}\nLight: {}\nTemp: {:.0f}°F".format(*reading)
+
+    def update():
+        # what render_task does when nothing changed
+        if view.stale(label, reading):
+            view.text(label, text)
+    return update
+
+
+CASES = (
+    ("rp poll (FetchEngine)", fetch_round),
+    ("sensor pass", sensor_round),
+    ("sparkline column", sparkline_round),
+    ("unchanged label", label_round),
+)
+
+
+def measure(step, rounds):
+    """ (bytes still held, bytes allocated) per round, after warming up
+
+    The memory held is compared between two points of the same run, so
+    what tracemalloc and this loop keep for themselves cancels out.
+    """
+    for _ in range(WARMUP):
+        step()
+    tracemalloc.start()
+    for _ in range(rounds):
+        step()
+    gc.collect()
+    middle = tracemalloc.get_traced_memory()[0]
+    for _ in range(rounds):
+        step()
+    gc.collect()
+    held = (tracemalloc.get_traced_memory()[0] - middle) / rounds
+    peak = 0
+    for _ in range(rounds // 10):
+        start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        step()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - start)
+    tracemalloc.stop()
+    return held, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="check the update paths for memory growth")
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args(argv)
+    print(f"{'path':<24}{'held B/round':>14}{'peak B/round':>14}")
+    growing = []
+    for name, make in CASES:
+        held, peak = measure(make(), args.rounds)
+        print(f"{name:<24}{held:>14.1f}{peak:>14}")
+        if held >= LEAK_BYTES:
+            growing.append(name)
+    if growing:
+        print("memory grows in: " + ", ".join(growing))
+        return 1
+    print("steady state: no growth")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# Host benchmark: display.py end to end against the replay server
+#
+# Run from the repository root:
+#
+#     python bench/bench_display.py [--seconds 30] [--latency 0.3] [--fail 0.1]
+#
+# Boots display.py on the stand-ins in sim/, taps through the three tabs
+# every TAP_INTERVAL seconds and lets the replay server change tracks every
+# --track-seconds.  Reports loop latency, view-switch time, memory
+# allocated per panel update and how many requests each endpoint got.
+# Timings are host timings: compare runs with each other, not with the
+# device.
+#
+# SPDX-License-Identifier: MIT
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "sim"))
+
+import run  # noqa: E402
+import replay  # noqa: E402
+
+TAP_INTERVAL = 1.5
+TABS = ((40, 20), (120, 20), (200, 20), (280, 20))  # Time, Music, Sensor, Recent
+
+
+class Allocations:
+    """ wrap a function and record the peak bytes allocated per call """
+
+    def __init__(self, func):
+        self.func = func
+        self.peaks = []
+
+    def __call__(self, *args, **kwargs):
+        tracemalloc.start()
+        try:
+            return self.func(*args, **kwargs)
+        finally:
+            self.peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    def summary(self, name) -> str:
+        if not self.peaks:
+            return f"{name}: not called"
+        peaks = sorted(self.peaks)
+        return (f"{name}: {len(peaks)} calls, allocated per call "
+                f"median {peaks[len(peaks) // 2]} B max {peaks[-1]} B")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="benchmark display.py on the host")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--fail", type=float, default=0.0)
+    parser.add_argument("--reset", type=float, default=0.0)
+    parser.add_argument("--track-seconds", type=float, default=12)
+    args = parser.parse_args(argv)
+
+    server = replay.serve(latency=args.latency, jitter=args.jitter, fail=args.fail,
+                          reset=args.reset, seed=1, track_seconds=args.track_seconds)
+    run.device_files()
+    taps = []
+    at = 1.0
+    while at < args.seconds:
+        x, y = TABS[len(taps) % len(TABS)]
+        taps.append((at, x, y))
+        at += TAP_INTERVAL
+    display = run.start(taps, server)
+    # the loop looks these up as globals on every call
+    music = display.update_music = Allocations(display.update_music)
+    weather = display.update_weather_panel = Allocations(display.update_weather_panel)
+    start = time.monotonic()
+    time.sleep(args.seconds)
+    elapsed = time.monotonic() - start
+
+    switch = display.profiler.phase("switch")
+    touch = display.profiler.phase("touch")
+    print(f"ran {elapsed:.0f} s, {len(taps)} taps, latency {args.latency} s, "
+          f"fail {args.fail}, reset {args.reset}")
+    print(f"loop: {display.governor.stats()}; touch sample max {touch.max_us} us")
+    print(f"view switch: last {display.touch_stats['last_ms']} ms "
+          f"max {display.touch_stats['max_ms']} ms (switch max {switch.max_us // 1000} ms)")
+    print(music.summary("update_music"))
+    print(weather.summary("update_weather_panel"))
+    print(f"requests: {server.stats()['requests']}")
+    print(f"per minute: " + ", ".join(f"{host} {n * 60 / elapsed:.1f}"
+                                       for host, n in server.stats()["requests"].items()))
+    print(display.boot.stats())
+    print(display.fetcher.stats())
+    print(display.fetcher.http_cache.stats())
+    print(display.fetcher.health())
+    print(display.connections.stats())
+    print(display.view.stats())
+    print(display.views.stats())
+
+
+if __name__ == "__main__":
+    main()
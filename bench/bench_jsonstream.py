@@ -0,0 +1,77 @@
+# CPython benchmark: streaming field extraction vs response.json()
+#
+# Run from the repository root:  python bench/bench_jsonstream.py
+#
+# The payloads in bench/payloads have the shape of the live responses; to
+# refresh them, save the output of e.g. `curl -s "$RP_URL"` over the files.
+#
+# SPDX-License-Identifier: MIT
+import os
+import sys
+import json
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from channels import song_paths  # noqa: E402
+from clock import TIME_FIELDS  # noqa: E402
+from jsonstream import extract  # noqa: E402
+from weather import WEATHER_TEMPERATURE  # noqa: E402
+
+CHUNK_SIZE = 256  # FetchEngine default
+ROUNDS = 50
+
+# the paths display.py reads, so the benchmark follows the device's workload
+CASES = (
+    ("rp_nowplaying.json", song_paths()),
+    ("weather_latest.json", (WEATHER_TEMPERATURE,)),
+    ("time_ip.json", TIME_FIELDS),
+)
+
+
+def chunked(body):
+    for i in range(0, len(body), CHUNK_SIZE):
+        yield body[i:i + CHUNK_SIZE]
+
+
+def whole_document(body, paths):
+    """ what response.json() does: buffer everything, then decode it all """
+    buffered = bytearray()
+    for chunk in chunked(body):
+        buffered.extend(chunk)
+    return json.loads(buffered)
+
+
+def streamed(body, paths):
+    return extract(chunked(body), paths)
+
+
+def measure(func, body, paths):
+    tracemalloc.start()
+    func(body, paths)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(body, paths)
+    per_call_us = (time.perf_counter() - start) / ROUNDS * 1e6
+    return peak, per_call_us
+
+
+def main():
+    print(f"{'payload':<22}{'bytes':>7}{'json peak':>11}{'stream peak':>13}"
+          f"{'saved':>7}{'json us':>9}{'stream us':>11}")
+    for name, paths in CASES:
+        with open(os.path.join(HERE, "payloads", name), "rb") as f:
+            body = f.read()
+        json_peak, json_us = measure(whole_document, body, paths)
+        stream_peak, stream_us = measure(streamed, body, paths)
+        saved = 100 - stream_peak * 100 // json_peak
+        print(f"{name:<22}{len(body):>7}{json_peak:>11}{stream_peak:>13}"
+              f"{saved:>6}%{json_us:>9.0f}{stream_us:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
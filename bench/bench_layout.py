@@ -0,0 +1,94 @@
+# CPython benchmark: cost of laying out the music and Recent views per update
+#
+# Run from the repository root:  python bench/bench_layout.py
+#
+# Uses the stand-in fonts and displayio from sim/, so the numbers show the
+# relative cost of a new track on the music view (three Marquee lines
+# drawn into their bitmaps), of the Recent list (one truncated line per
+# track, cold and cached) and of a marquee frame, rather than absolute
+# device timings.
+#
+# SPDX-License-Identifier: MIT
+import os
+import sys
+import json
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(1, os.path.join(os.path.dirname(HERE), "sim"))
+
+from adafruit_bitmap_font import bitmap_font  # noqa: E402
+from layout import TextLayout  # noqa: E402
+from marquee import Marquee  # noqa: E402
+
+MUSIC_WIDTH = 320 - 0 - 2  # music_lines viewport on the 320 px screen
+RECENT_WIDTH = 320 - 2 - 4  # recent_data width
+ROUNDS = 200
+
+
+def music_text(song):
+    return (song["title"], song["artist"], song["album"] + " " + song["year"])
+
+
+def recent_lines(songs):
+    return [f"12:{i:02d} {song['artist']} - {song['title']}" for i, song in enumerate(songs)]
+
+
+def per_call_us(func, rounds=ROUNDS):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    with open(os.path.join(HERE, "payloads", "rp_nowplaying.json"), "rb") as f:
+        songs = json.load(f)["song"]
+    font_mid = bitmap_font.load_font("/fonts/luBS19.bdf")
+    font = bitmap_font.load_font("/fonts/Helvetica-Bold-16.bdf")
+    lines = [Marquee(font_mid, MUSIC_WIDTH) for _ in range(3)]
+    recent = recent_lines(songs)
+
+    def new_track():
+        # every song is new to the lines, so each is drawn into a bitmap
+        for song in songs:
+            for line, text in zip(lines, music_text(song)):
+                line.text = None
+                line.set_text(text)
+
+    def recent_cold():
+        layout = TextLayout()
+        layout._ascii[id(font)] = warm._ascii[id(font)]
+        layout._other[id(font)] = warm._other[id(font)]
+        for line in recent:
+            layout.truncate(font, line, RECENT_WIDTH)
+
+    def recent_cached():
+        for line in recent:
+            warm.truncate(font, line, RECENT_WIDTH)
+
+    warm = TextLayout()
+    recent_cached()
+    track_us = per_call_us(new_track) / len(songs)
+    # the longest title, artist and album of the payload, as scrolled
+    for i, line in enumerate(lines):
+        line.set_text(max((music_text(song)[i] for song in songs), key=len))
+    scrolling = [line for line in lines if line.scrolling]
+
+    def marquee_frame():
+        for line in scrolling:
+            line.step()
+
+    print(f"music view new track:  {track_us:8.1f} us per update")
+    print(f"recent list, cold:     {per_call_us(recent_cold):8.1f} us per redraw")
+    print(f"recent list, cached:   {per_call_us(recent_cached):8.1f} us per redraw")
+    print(f"marquee frame:         {per_call_us(marquee_frame, ROUNDS * 10):8.1f} us "
+          f"for {len(scrolling)} lines")
+    print(warm.stats())
+    for line in recent:
+        print("  " + warm.truncate(font, line, RECENT_WIDTH))
+
+
+if __name__ == "__main__":
+    main()
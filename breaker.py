@@ -0,0 +1,92 @@
+# Per-endpoint circuit breakers with exponential backoff
+#
+# SPDX-License-Identifier: MIT
+import time
+import random
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """ stop calling an endpoint that keeps failing, and try it again later
+
+    After ``threshold`` failures in a row the breaker opens: ``allow()``
+    says no until a backoff has passed, then lets one trial request through
+    (half-open).  A success closes it; a failed trial opens it again with
+    the backoff doubled, up to ``cap`` seconds.  Each backoff is spread by
+    up to ``jitter`` of itself so several units do not retry in step.
+    ``unhealthy_for()`` is how long the endpoint has been failing.
+
+        :param name: what the stats line calls the endpoint
+        :param threshold: failures in a row that open the breaker
+        :param base: first backoff in seconds
+        :param cap: longest backoff in seconds
+        :param jitter: share of the backoff added or taken at random
+    """
+
+    def __init__(self, name, threshold=3, base=10, cap=600, jitter=0.2):
+        self.name = name
+        self.threshold = threshold
+        self.base = base
+        self.cap = cap
+        self.jitter = jitter
+        self.state = CLOSED
+        self.failures = 0  # in a row
+        self.opens = 0
+        self.unhealthy_total = 0.0  # seconds, over past outages
+        self._opens_in_row = 0
+        self._retry_at = 0.0
+        self._failing_since = None
+
+    def backoff(self) -> float:
+        """ seconds the breaker stays open after its current run of opens """
+        delay = min(self.base * (1 << min(self._opens_in_row - 1, 16)), self.cap)
+        return delay * (1 + self.jitter * (2 * random.random() - 1))
+
+    def allow(self) -> bool:
+        """ True if a request may go out now """
+        if self.state == OPEN and time.monotonic() >= self._retry_at:
+            self.state = HALF_OPEN
+        return self.state != OPEN
+
+    def success(self):
+        if self._failing_since is not None:
+            self.unhealthy_total += time.monotonic() - self._failing_since
+            self._failing_since = None
+        self.state = CLOSED
+        self.failures = 0
+        self._opens_in_row = 0
+
+    def failure(self):
+        now = time.monotonic()
+        if self._failing_since is None:
+            self._failing_since = now
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            self.state = OPEN
+            self.opens += 1
+            self._opens_in_row += 1
+            self._retry_at = now + self.backoff()
+
+    def retry_in(self) -> float:
+        """ seconds until an open breaker lets a trial through, else 0 """
+        if self.state != OPEN:
+            return 0.0
+        return max(self._retry_at - time.monotonic(), 0)
+
+    def unhealthy_for(self) -> float:
+        """ seconds since the current run of failures began, 0 if healthy """
+        if self._failing_since is None:
+            return 0.0
+        return time.monotonic() - self._failing_since
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        text = f"{self.name} {self.state}"
+        if self._failing_since is not None:
+            text += f" unhealthy {self.unhealthy_for():.0f} s"
+        if self.state == OPEN:
+            text += f" retry in {self.retry_in():.0f} s"
+        return text + f" ({self.opens} opens {self.unhealthy_total:.0f} s unhealthy before)"
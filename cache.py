@@ -0,0 +1,98 @@
+# Persistent key/value cache for warm restarts
+#
+# SPDX-License-Identifier: MIT
+import time
+import json
+import struct
+
+_MAGIC = b"RPC1"
+_HEADER = "<4sH"  # magic, length of the JSON that follows
+_HEADER_SIZE = struct.calcsize(_HEADER)
+
+
+class FlashCache:
+    """ last good values per endpoint, kept across reloads and power cycles
+
+    Entries live in a byte store (``microcontroller.nvm`` on the device,
+    which code can always write, unlike the CIRCUITPY drive) as one small
+    JSON document.  Writes are coalesced: ``put()`` only marks the cache
+    dirty and ``flush()`` writes at most once per ``write_interval``
+    seconds, and only if the bytes actually changed.
+
+        :param store: a writable bytes-like store such as ``microcontroller.nvm``
+        :param ttls: seconds each key stays fresh, e.g. ``{"weather": 1800}``
+        :param write_interval: minimum seconds between writes
+    """
+
+    def __init__(self, store, ttls=None, write_interval=900):
+        self.store = store
+        self.ttls = ttls or {}
+        self.write_interval = write_interval
+        self.writes = 0
+        self._entries = {}
+        self._dirty = False
+        self._last_write = time.monotonic()
+        self.load()
+
+    def load(self):
+        """ read the entries back from the store; a blank or corrupt store is empty """
+        try:
+            magic, length = struct.unpack(_HEADER, bytes(self.store[:_HEADER_SIZE]))
+            if magic == _MAGIC:
+                raw = bytes(self.store[_HEADER_SIZE:_HEADER_SIZE + length])
+                self._entries = json.loads(str(raw, "utf-8"))
+        except (ValueError, TypeError) as e:
+            print(f"cache: starting empty ({e})")
+            self._entries = {}
+
+    def get(self, key, default=None):
+        """ the cached value, however old """
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        return entry[1]
+
+    def fresh(self, key) -> bool:
+        """ True if key was stored less than its TTL ago
+
+        Wall-clock based, so an entry written before a power cycle (which
+        resets the RTC) only becomes fresh again once the clock is set.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        age = time.time() - entry[0]
+        return 0 <= age <= self.ttls.get(key, 0)
+
+    def put(self, key, value):
+        """ remember value for key; written by the next due ``flush()`` """
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] == value:
+            # refresh the age in RAM only; not worth a flash write
+            entry[0] = time.time()
+            return
+        self._entries[key] = [time.time(), value]
+        self._dirty = True
+
+    def flush(self, force=False) -> bool:
+        """ write the entries if dirty and due (or forced); True if written """
+        if not self._dirty:
+            return False
+        if not force and time.monotonic() - self._last_write < self.write_interval:
+            return False
+        raw = json.dumps(self._entries).encode()
+        data = struct.pack(_HEADER, _MAGIC, len(raw)) + raw
+        self._dirty = False
+        self._last_write = time.monotonic()
+        if len(data) > len(self.store):
+            print(f"cache: {len(data)} bytes does not fit in {len(self.store)}")
+            return False
+        if bytes(self.store[:len(data)]) == data:
+            return False
+        self.store[:len(data)] = data
+        self.writes += 1
+        return True
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return f"cache: {len(self._entries)} entries {self.writes} writes"
@@ -0,0 +1,127 @@
+# Radio Paradise channels, each with its own poll schedule, cache entry and history
+#
+# SPDX-License-Identifier: MIT
+import time
+
+from history import History
+from rp import MusicSchedule
+
+# channel number -> the name RP uses as the stream source
+NAMES = {0: "The Main Mix", 1: "Mellow Mix", 2: "Rock Mix", 3: "Global Mix"}
+
+# The only values read from each song; everything else is skipped
+SONG_FIELDS = ("event", "title", "artist", "album", "year", "listener_rating",
+               "sched_time_millis", "duration", "cover_small")
+# the older songs of the list only feed the history
+HISTORY_FIELDS = ("event", "title", "artist", "album", "sched_time_millis")
+
+_URL = ("https://api.radioparadise.com/api/nowplaying_list_v2022?chan={chan}&source={source}"
+        "&player_id=&sync_id=chan_{chan}&type=channel&mode=wip-channel&list_num={count}")
+
+
+def nowplaying_url(chan, count=4) -> str:
+    """ the now-playing list URL for channel chan, count songs long """
+    source = NAMES.get(chan, "").replace(" ", "%20")
+    return _URL.format(chan=chan, source=source, count=count)
+
+
+def song_paths(count=4) -> tuple:
+    """ the paths read from a list of count songs: ``SONG_FIELDS`` of the
+    current song, ``HISTORY_FIELDS`` of the older ones """
+    return (tuple("song[0]." + name for name in SONG_FIELDS) +
+            tuple(f"song[{i}].{name}" for i in range(1, count) for name in HISTORY_FIELDS))
+
+
+def hub_url(hub, chan) -> str:
+    """ channel chan's songs on the LAN hub at hub (see hub.py) """
+    return f"{hub}/music?chan={chan}"
+
+
+def parse_channels(setting) -> list:
+    """ channel numbers from a setting such as "0,2,3" (or a single int) """
+    chans = []
+    for part in str(setting).split(","):
+        part = part.strip()
+        if part:
+            chans.append(int(part))
+    return chans
+
+
+class Channel:
+    """ what is known about one channel: the latest song, when its track
+    ends and what played before
+
+        :param chan: the RP channel number
+        :param count: songs asked for per poll
+        :param history_size: tracks kept in its history
+        :param hub: base URL of a LAN hub to ask instead of Radio Paradise
+    """
+
+    def __init__(self, chan, count=4, history_size=12, hub=None):
+        self.chan = chan
+        self.name = NAMES.get(chan, f"Channel {chan}")
+        self.url = hub_url(hub, chan) if hub else nowplaying_url(chan, count)
+        # the Main Mix keeps the key it had before there were channels, so
+        # an existing cache entry is still found
+        self.cache_key = "music" if chan == 0 else f"music{chan}"
+        self.schedule = MusicSchedule()
+        self.history = History(history_size)
+        self.info = None
+        self.next_poll = 0  # monotonic seconds
+        self.polls = 0
+
+
+class ChannelScheduler:
+    """ decide which channel to poll next, and when
+
+    Every channel wants a poll just after its own track ends, so left alone
+    the polls would bunch up (always at boot, and whenever two channels'
+    tracks end together).  The channel due soonest goes next, ties going
+    round-robin from the one polled last, and no poll starts less than
+    ``spacing`` seconds after the previous one, so the socket and the UI
+    see at most one fetch per ``spacing``.
+
+        :param channels: the Channels to poll
+        :param spacing: minimum seconds between two polls
+    """
+
+    def __init__(self, channels, spacing=10):
+        self.channels = channels
+        self.spacing = spacing
+        self._last = -1  # index of the channel polled last
+        self._last_poll = None
+
+    def schedule(self, channel, delay):
+        """ poll channel delay seconds from now """
+        channel.next_poll = time.monotonic() + delay
+
+    def hurry(self, channel):
+        """ poll channel as soon as the spacing allows """
+        channel.next_poll = 0
+
+    def polled(self, channel, delay):
+        """ channel was just polled; poll it again in delay seconds """
+        self._last = self.channels.index(channel)
+        self._last_poll = time.monotonic()
+        channel.polls += 1
+        self.schedule(channel, delay)
+
+    def next(self):
+        """ (channel to poll next, seconds to wait before polling it) """
+        count = len(self.channels)
+        best = None
+        for step in range(1, count + 1):
+            channel = self.channels[(self._last + step) % count]
+            if best is None or channel.next_poll < best.next_poll:
+                best = channel
+        start = best.next_poll
+        if self._last_poll is not None:
+            start = max(start, self._last_poll + self.spacing)
+        return best, max(start - time.monotonic(), 0)
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        now = time.monotonic()
+        return "channels: " + " ".join(
+            f"{channel.chan}:{channel.polls} polls next {max(channel.next_poll - now, 0):.0f} s"
+            for channel in self.channels)
@@ -0,0 +1,182 @@
+# Drift-compensated RTC kept in step by HTTP Date headers
+#
+# SPDX-License-Identifier: MIT
+import time
+
+try:
+    import rtc
+except ImportError:
+    rtc = None  # CPython, e.g. the hub: only the date helpers are used there
+
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+           "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+# the only values read from the time API: the UTC offset is what the clock lacks
+TIME_FIELDS = ("datetime", "utc_offset")
+
+
+def epoch(year, month, mday, hours=0, minutes=0, seconds=0) -> int:
+    """ seconds since 1970-01-01 for a calendar date, no time zone involved """
+    # days from civil, after Howard Hinnant's date algorithms
+    year -= month <= 2
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + mday - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    days = era * 146097 + doe - 719468
+    return days * 86400 + hours * 3600 + minutes * 60 + seconds
+
+
+def parse_http_date(value):
+    """ UTC epoch seconds from an RFC 7231 date such as
+    ``Sat, 17 Oct 2026 01:28:19 GMT``, or None if it does not parse """
+    try:
+        _, mday, month, year, hms, _ = value.split()
+        hours, minutes, seconds = (int(x) for x in hms.split(":"))
+        return epoch(int(year), _MONTHS.index(month) + 1, int(mday), hours, minutes, seconds)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _seconds():
+    return time.monotonic_ns() // 1000000000
+
+
+class ClockService:
+    """ keep the RTC on UTC + utc_offset using time samples from any response
+
+    Every HTTP response carries a ``Date`` header, so the RP and weather.gov
+    polls double as time samples.  The samples give the RTC's error; a
+    least-squares fit over the recent ones gives its drift, and ``tick()``
+    moves the RTC toward the predicted error at most ``slew`` seconds at a
+    time so the displayed minute never jumps.  Errors over ``step_limit``
+    (and an unset RTC) are corrected in one step.  The time API is only
+    needed for the UTC offset, or when no samples arrive for
+    ``resync_after`` seconds.  Until then ``now_utc()`` runs on from the
+    last ``Date`` header, which is UTC whatever the offset.
+
+        :param utc_offset: seconds local time is ahead of UTC, if known
+        :param max_samples: samples kept for the drift fit
+        :param step_limit: errors above this many seconds are stepped
+        :param slew: most seconds corrected per tick
+        :param deadband: predicted errors below this are left alone
+        :param boot_grace: seconds to wait for a first sample before asking
+                           for a resync
+        :param resync_after: seconds without samples before asking for a resync
+    """
+
+    def __init__(self, utc_offset=None, max_samples=8, step_limit=120, slew=1,
+                 deadband=1.5, boot_grace=60, resync_after=7200):
+        self.utc_offset = utc_offset
+        self.max_samples = max_samples
+        self.step_limit = step_limit
+        self.slew = slew
+        self.deadband = deadband
+        self.boot_grace = boot_grace
+        self.resync_after = resync_after
+        self.steps = 0
+        self.slews = 0
+        self._samples = []  # (monotonic seconds, RTC error in seconds)
+        self._last_sample = _seconds()
+        self._date = None  # (UTC, monotonic) of the last sample, offset or not
+        self._set = time.localtime().tm_year >= 2024  # survived a reload
+
+    @property
+    def is_set(self) -> bool:
+        """ True once the RTC holds a real date """
+        return self._set and self.utc_offset is not None
+
+    def now_utc(self):
+        """ UTC epoch seconds: from the RTC once it is set, before that from
+        the last Date header seen; None until there is either """
+        if self.is_set:
+            return time.time() - self.utc_offset
+        if self._date is None:
+            return None
+        return self._date[0] + time.monotonic() - self._date[1]
+
+    def _adjust(self, seconds):
+        rtc.RTC().datetime = time.localtime(int(time.time() + seconds))
+
+    def set_time(self, utc, utc_offset):
+        """ step the RTC to utc (e.g. from the time API) and start a new fit """
+        self.utc_offset = utc_offset
+        rtc.RTC().datetime = time.localtime(int(utc + utc_offset))
+        self._set = True
+        self._samples = []
+        self._last_sample = _seconds()
+        self.steps += 1
+
+    def sample(self, utc):
+        """ record that it is utc now; the first sample sets an unset RTC """
+        if utc is None:
+            return
+        self._date = (utc, time.monotonic())
+        if self.utc_offset is None:
+            return
+        self._last_sample = _seconds()
+        if not self._set:
+            self.set_time(utc, self.utc_offset)
+            return
+        error = utc - (time.time() - self.utc_offset)
+        self._samples.append((self._last_sample, error))
+        if len(self._samples) > self.max_samples:
+            self._samples.pop(0)
+
+    def observe_headers(self, headers):
+        """ take a sample from a response's ``Date`` header """
+        self.sample(parse_http_date(headers.get("date")))
+
+    def drift(self) -> float:
+        """ RTC drift in seconds per second (positive: the RTC runs slow) """
+        samples = self._samples
+        if len(samples) < 3 or samples[-1][0] - samples[0][0] < 600:
+            return 0.0
+        t0 = samples[0][0]
+        mean_t = sum(s[0] - t0 for s in samples) / len(samples)
+        mean_e = sum(s[1] for s in samples) / len(samples)
+        num = sum((s[0] - t0 - mean_t) * (s[1] - mean_e) for s in samples)
+        den = sum((s[0] - t0 - mean_t) ** 2 for s in samples)
+        return num / den if den else 0.0
+
+    def error(self) -> float:
+        """ predicted seconds the RTC is behind UTC right now """
+        samples = self._samples
+        if not samples:
+            return 0.0
+        now = _seconds()
+        mean_t = sum(s[0] for s in samples) / len(samples)
+        mean_e = sum(s[1] for s in samples) / len(samples)
+        return mean_e + self.drift() * (now - mean_t)
+
+    def tick(self) -> int:
+        """ nudge the RTC toward UTC; returns the seconds applied """
+        if not self.is_set:
+            return 0
+        error = self.error()
+        if abs(error) < self.deadband:
+            return 0
+        if abs(error) > self.step_limit:
+            correction = int(error)
+            self.steps += 1
+        else:
+            correction = self.slew if error > 0 else -self.slew
+            self.slews += 1
+        self._adjust(correction)
+        # setting the RTC also drops its sub-second phase; later samples
+        # pick that up, so shifting the history by the nominal step is enough
+        self._samples = [(t, e - correction) for t, e in self._samples]
+        return correction
+
+    def needs_resync(self) -> bool:
+        """ True if the time API should be asked """
+        if self.utc_offset is None:
+            return True
+        quiet = _seconds() - self._last_sample
+        if not self._set:
+            return quiet > self.boot_grace
+        return quiet > self.resync_after
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return (f"clock: error {self.error():.1f} s drift {self.drift() * 1e6:.0f} ppm "
+                f"{len(self._samples)} samples {self.steps} steps {self.slews} slews")
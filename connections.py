@@ -0,0 +1,146 @@
+# Keep-alive HTTP connections shared by the time, music and weather polls
+#
+# SPDX-License-Identifier: MIT
+import gc
+import time
+
+import adafruit_connection_manager
+import adafruit_requests
+
+
+def _mem_free():
+    try:
+        return gc.mem_free()
+    except AttributeError:
+        return None
+
+
+def _host(url):
+    return url.split("/", 3)[2]
+
+
+class ConnectionPool:
+    """ reuse one open socket per host instead of reconnecting every poll
+
+    A new socket to an https host costs a TLS handshake on the ESP32, which
+    takes seconds.  adafruit_requests can keep a socket open between
+    requests, but only if every response is read to the end, and a socket
+    left half-read by an error blocks that host for good.  This pool keeps
+    at most ``max_sockets`` hosts connected (fetches are serialized, so one
+    socket per host is enough; the ESP32 firmware allows a single TLS
+    socket, so there the bound is 1), closes sockets idle longer than
+    ``idle_timeout`` (the server has most likely dropped them by then), and
+    closes every idle socket when free memory falls below ``min_free``.
+    ``handshakes`` counts requests that needed a new socket, ``reuses`` the
+    ones that did not.  ``wake``, if set, is called before each request so
+    a powered-down radio can be brought back first.
+
+    Reuse only pays off for bursts to one host: several channels polled
+    ``CHANNEL_SPACING`` apart, or everything behind a LAN hub.  Polls of a
+    single channel are a track apart, far beyond ``idle_timeout``, and the
+    PowerManager closes every socket when it powers the radio down
+    between them, so there every request is a handshake ("0 reused").
+    With one socket allowed, a cover from the image host also evicts the
+    API host's socket.
+
+        :param wifi: the WiFiManager, used to (re)connect the access point
+        :param max_sockets: hosts kept connected at once
+        :param idle_timeout: seconds before an unused socket is closed
+        :param min_free: bytes of free memory below which idle sockets go
+    """
+
+    def __init__(self, wifi, max_sockets=1, idle_timeout=50, min_free=24000):
+        self.wifi = wifi
+        self.max_sockets = max_sockets
+        self.idle_timeout = idle_timeout
+        self.min_free = min_free
+        socket_pool = adafruit_connection_manager.get_radio_socketpool(wifi.esp)
+        ssl_context = adafruit_connection_manager.get_radio_ssl_context(wifi.esp)
+        self._session = adafruit_requests.Session(socket_pool, ssl_context)
+        self._manager = adafruit_connection_manager.get_connection_manager(socket_pool)
+        self._sockets = {}  # host -> socket of its last response
+        self._used = {}  # host -> monotonic time of its last request
+        self._response = None
+        self._response_host = None
+        self.wake = None
+        self.requests = 0
+        self.handshakes = 0
+        self.reuses = 0
+        self.evictions = 0
+
+    def _close(self, host):
+        socket = self._sockets.pop(host, None)
+        self._used.pop(host, None)
+        if socket is None:
+            return
+        try:
+            self._manager.close_socket(socket)
+        except RuntimeError:
+            pass  # the session already closed it after a failure
+        self.evictions += 1
+
+    def evict(self, keep=None):
+        """ close sockets that timed out, then make room for a socket to host
+        keep, closing every other one when memory is short """
+        now = time.monotonic()
+        free = _mem_free()
+        short = free is not None and free < self.min_free
+        for host in list(self._sockets):
+            if now - self._used[host] > self.idle_timeout or (short and host != keep):
+                self._close(host)
+        while len(self._sockets) >= self.max_sockets + (keep in self._sockets):
+            idle = [host for host in self._sockets if host != keep]
+            if not idle:
+                break
+            self._close(min(idle, key=lambda host: self._used[host]))
+
+    def get(self, url, **kwargs):
+        """ GET url on a kept-alive socket where possible """
+        if self._response is not None and self._response.socket is not None:
+            # not read to the end: the socket still has unread bytes on it
+            self._close(self._response_host)
+            self._response.socket = None
+        self._response = None
+        host = _host(url)
+        self.evict(keep=host)
+        if self.wake:
+            self.wake()
+        if not self.wifi.esp.is_connected:
+            self.wifi.connect()
+        self.requests += 1
+        response = self._session.get(url, **kwargs)
+        if response.socket is self._sockets.get(host):
+            self.reuses += 1
+        else:
+            self.handshakes += 1
+        self._sockets[host] = response.socket
+        self._used[host] = time.monotonic()
+        self._response = response
+        self._response_host = host
+        return response
+
+    def close_all(self):
+        """ close every socket, e.g. before the WiFi is reset """
+        for host in list(self._sockets):
+            self._close(host)
+        if self._response is not None:
+            self._response.socket = None
+            self._response = None
+
+    def drop(self, host):
+        """ close host's socket so the next request opens a fresh one """
+        if self._response is not None and self._response_host == host:
+            self._response.socket = None
+            self._response = None
+        self._close(host)
+
+    def reset(self):
+        """ close every socket and reset the ESP32; the next request
+        reconnects to the access point """
+        self.close_all()
+        self.wifi.reset()
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return (f"connections: {self.requests} requests {self.handshakes} handshakes "
+                f"{self.reuses} reused {self.evictions} evicted {len(self._sockets)} open")
@@ -0,0 +1,206 @@
+# Album covers: streamed to flash, shrunk to a palette BMP, kept in an LRU directory
+#
+# SPDX-License-Identifier: MIT
+import os
+import struct
+
+import asyncio
+import displayio
+
+try:
+    import jpegio
+except ImportError:
+    jpegio = None  # CircuitPython before 9.1: no covers, the rest still runs
+
+_DOWNLOAD = "download.jpg"
+_ROW_YIELD = 8  # rows converted between yields to the event loop
+
+
+def _bmp_header(width, height) -> bytes:
+    """ file and info headers of an 8 bit BMP with a 256 entry color table """
+    row_bytes = (width + 3) & ~3
+    offset = 14 + 40 + 256 * 4
+    return (struct.pack("<2sIHHI", b"BM", offset + row_bytes * height, 0, 0, offset) +
+            struct.pack("<IiiHHIIiiII", 40, width, height, 1, 8, 0, row_bytes * height,
+                        2835, 2835, 256, 0))
+
+
+def _rgb332_table() -> bytes:
+    """ the fixed palette: 3 bits red, 3 bits green, 2 bits blue """
+    table = bytearray(256 * 4)
+    for i in range(256):
+        table[i * 4] = (i & 0x03) * 255 // 3  # blue
+        table[i * 4 + 1] = (i >> 2 & 0x07) * 255 // 7  # green
+        table[i * 4 + 2] = (i >> 5) * 255 // 7  # red
+    return table
+
+
+async def jpeg_to_bmp(source, target, size):
+    """ decode the JPEG at source, shrunk to at most size pixels a side,
+    and write it to target as an 8 bit BMP that OnDiskBitmap can show
+
+    jpegio only scales by 1/2, 1/4 and 1/8, so the result can be smaller
+    than size.  Colors are mapped to a fixed RGB332 palette, which needs
+    no second pass over the pixels.  Rows are written bottom up, as BMP
+    stores them; the event loop gets a turn every few rows.
+    """
+    decoder = jpegio.JpegDecoder()
+    width, height = decoder.open(source)
+    scale = 0
+    while scale < 3 and max(width, height) > size << scale:
+        scale += 1
+    width = (width + (1 << scale) - 1) >> scale
+    height = (height + (1 << scale) - 1) >> scale
+    bitmap = displayio.Bitmap(width, height, 65536)
+    decoder.decode(bitmap, scale=scale)
+    row = bytearray((width + 3) & ~3)
+    with open(target, "wb") as f:
+        f.write(_bmp_header(width, height))
+        f.write(_rgb332_table())
+        for y in range(height - 1, -1, -1):
+            for x in range(width):
+                pixel = bitmap[x, y]
+                pixel = (pixel & 0xFF) << 8 | pixel >> 8  # jpegio writes RGB565_SWAPPED
+                row[x] = (pixel >> 13) << 5 | (pixel >> 8 & 0x07) << 2 | (pixel >> 3 & 0x03)
+            f.write(row)
+            if y % _ROW_YIELD == 0:
+                await asyncio.sleep(0)
+
+
+class CoverCache:
+    """ album covers ready for ``displayio.OnDiskBitmap``, least recently
+    used dropped first
+
+    A miss streams the JPEG to a file through the FetchEngine, so the
+    download never sits in RAM, then converts it to ``<key>.bmp``.  A hit
+    costs neither network nor decoding.  The directory is kept under
+    ``max_bytes`` by deleting the covers used longest ago; after a reload
+    the order is rebuilt from the file times, so it is only approximately
+    least-recently-used until the covers have been shown again.  Like the
+    glyph cache, writing needs a writable CIRCUITPY drive; without one, or
+    without jpegio, ``enabled`` is False and lookups always miss.
+
+        :param directory: where the covers are kept
+        :param max_bytes: total size the BMP files may take
+        :param size: longest side, in pixels, of a converted cover
+        :param phase: a perf Phase to record the conversions in, or None
+    """
+
+    def __init__(self, directory="/covers", max_bytes=200000, size=80, phase=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = size
+        self.phase = phase
+        self.enabled = jpegio is not None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.failures = 0
+        self._files = []  # [key, bytes], least recently used first
+        if self.enabled:
+            self._scan()
+
+    def _path(self, key) -> str:
+        return f"{self.directory}/{key}.bmp"
+
+    def _scan(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            try:
+                os.mkdir(self.directory)
+            except OSError as e:
+                print(f"covers disabled: {e}")
+                self.enabled = False
+            return
+        found = []
+        for name in names:
+            if not name.endswith(".bmp"):
+                continue
+            stat = os.stat(self.directory + "/" + name)
+            found.append((stat[8], name[:-4], stat[6]))  # mtime, key, size
+        found.sort()
+        self._files = [[key, size] for _, key, size in found]
+
+    def _entry(self, key):
+        for entry in self._files:
+            if entry[0] == key:
+                return entry
+        return None
+
+    @property
+    def used_bytes(self) -> int:
+        return sum(size for _, size in self._files)
+
+    def lookup(self, key):
+        """ path of the cover for key if it is cached, else None """
+        entry = self._entry(key)
+        if entry is None:
+            return None
+        self._files.remove(entry)
+        self._files.append(entry)
+        self.hits += 1
+        return self._path(key)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def discard(self, key):
+        """ forget the cover for key, e.g. when it failed to load """
+        entry = self._entry(key)
+        if entry is not None:
+            self._files.remove(entry)
+        self._remove(self._path(key))
+
+    def evict(self, *keep):
+        """ delete the least recently used covers, except the keys in keep,
+        until the directory fits in max_bytes """
+        for entry in list(self._files):
+            if self.used_bytes <= self.max_bytes:
+                return
+            if entry[0] in keep:
+                continue  # on screen: OnDiskBitmap reads it as it draws
+            self._remove(self._path(entry[0]))
+            self._files.remove(entry)
+            self.evictions += 1
+
+    async def fetch(self, fetcher, url, key, keep=None):
+        """ download and convert the cover at url; its path, or None
+
+        keep is the key of the cover on screen, which is never evicted.
+        """
+        if not self.enabled:
+            return None
+        self.misses += 1
+        download = f"{self.directory}/{_DOWNLOAD}"
+        if await fetcher.download(url, download, "get cover") is None:
+            self.failures += 1
+            return None
+        path = self._path(key)
+        try:
+            if self.phase is not None:
+                self.phase.start()
+            try:
+                await jpeg_to_bmp(download, path, self.size)
+            finally:
+                if self.phase is not None:
+                    self.phase.stop()
+            os.remove(download)
+            self._files.append([key, os.stat(path)[6]])
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"cover {key}: {e}")
+            self.failures += 1
+            self._remove(path)  # a partial bitmap would be shown as the cover
+            return None
+        self.evict(key, keep)
+        return path
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return (f"covers: {self.hits} hits {self.misses} misses {self.failures} failures "
+                f"{len(self._files)} files {self.used_bytes // 1024} KB "
+                f"{self.evictions} evicted")
@@ -4,11 +4,17 @@
 #
 # SPDX-License-Identifier: MIT
 import time
+from startup import BootTimer
+
+boot = BootTimer()  # started before the other imports so they count too
+boot.stage("imports")
+import asyncio
 import board
 import microcontroller
 import displayio
 import busio
-import gc
+import sys
+import terminalio
 
 import adafruit_adt7410
 import adafruit_touchscreen
@@ -19,9 +25,6 @@ from adafruit_pyportal import PyPortal
 from analogio import AnalogIn
 
 # -- additional imports -- #
-import adafruit_connection_manager  # -- appear unused
-import adafruit_requests  # -- appear unused
-import rtc
 from os import getenv
 
 from adafruit_esp32spi import adafruit_esp32spi
@@ -29,26 +32,25 @@ from adafruit_esp32spi.adafruit_esp32spi_wifimanager import WiFiManager
 import neopixel
 from digitalio import DigitalInOut
 
-# Get wifi details and more from a settings.toml file
-# tokens used by this Demo: CIRCUITPY_WIFI_SSID, CIRCUITPY_WIFI_PASSWORD
-# If you are using a board with pre-defined ESP32 Pins:
-esp32_cs = DigitalInOut(board.ESP_CS)
-esp32_ready = DigitalInOut(board.ESP_BUSY)
-esp32_reset = DigitalInOut(board.ESP_RESET)
-
-# Secondary (SCK1) SPI used to connect to WiFi board on Arduino Nano Connect RP2040
-if "SCK1" in dir(board):
-    spi = busio.SPI(board.SCK1, board.MOSI1, board.MISO1)
-else:
-    spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
-esp = adafruit_esp32spi.ESP_SPIcontrol(spi, esp32_cs, esp32_ready, esp32_reset)
-
-# ------------- WifI Connection ------------- #
-status_pixel = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.2)
-ssid = getenv("CIRCUITPY_WIFI_SSID")
-password = getenv("CIRCUITPY_WIFI_PASSWORD")
+from cache import FlashCache
+from channels import (HISTORY_FIELDS, SONG_FIELDS, Channel, ChannelScheduler, parse_channels,
+                      song_paths)
+from clock import TIME_FIELDS, ClockService, epoch
+from connections import ConnectionPool
+from covers import CoverCache
+from fetch import FetchEngine
+from glyphs import GlyphManager
+from governor import FrameGovernor
+from layout import TextLayout
+from marquee import Marquee
+from perf import Profiler
+from power import PowerManager
+from render import ViewModel, quantize
+from sensors import Sampler, Series, Sparkline
+from touch import PRESS, RegionMap, TouchInput
+from views import ViewManager
+from weather import HUB_TEMPERATURE, WEATHER_TEMPERATURE
 
-wifi = WiFiManager(esp, ssid, password, status_pixel=status_pixel)
 # ------------- Constants ------------- #
 
 # Hex Colors
@@ -65,7 +67,7 @@ SCREEN_HEIGHT = 240
 
 TABS_X = 0
 TABS_Y = 40  # previously 40
-TAB_BUTTON_WIDTH = int(SCREEN_WIDTH / 3)
+TAB_BUTTON_WIDTH = int(SCREEN_WIDTH / 4)
 
 # Default State
 view_live = 1
@@ -77,9 +79,82 @@ switch_state = 0
 TEXT_OUTPUT_MODE = False  # Set to True for console text output instead of display
 #TIME_API = "http://worldtimeapi.org/api/ip"
 TIME_API = "https://time.now/developer/api/ip"
-RP_URL = "https://api.radioparadise.com/api/nowplaying_list_v2022?chan=0&source=The%20Main%20Mix&player_id=&sync_id=chan_0&type=channel&mode=wip-channel&list_num=4"
+# Radio Paradise channels to follow, e.g. RP_CHANNELS = "0,1,2,3" in settings.toml
+# (0 The Main Mix, 1 Mellow Mix, 2 Rock Mix, 3 Global Mix)
+RP_CHANNELS = parse_channels(getenv("RP_CHANNELS") or "0")
 WEATHER = "https://api.weather.gov/stations/KOWD/observations/latest"
 
+# The only values read from each payload (TIME_FIELDS, SONG_PATHS and
+# WEATHER_TEMPERATURE); everything else is skipped while streaming
+RP_LIST_NUM = 4  # songs asked for in each RP list
+SONG_PATHS = song_paths(RP_LIST_NUM)
+WEATHER_FAILED = "failed to get weather"
+COVER_URL = "https://img.radioparadise.com/"  # the payload's cover paths are relative to this
+ART_SIZE = 80  # longest side of a cover on screen, in pixels
+CHANNEL_SPACING = 10  # least seconds between two RP polls, whichever the channels
+# A LAN hub (python routine.py --hub) polls the upstreams once for every
+# display, e.g. RP_HUB = "http://192.168.1.20:8081" in settings.toml; its
+# answers are plain HTTP and hold only the fields read here
+RP_HUB = getenv("RP_HUB")
+if RP_HUB:
+    TIME_API = RP_HUB + "/time"
+    WEATHER = RP_HUB + "/weather"
+    WEATHER_TEMPERATURE = HUB_TEMPERATURE
+    COVER_URL = RP_HUB + "/cover/"
+
+# Seconds each cached result is trusted after a reload before refetching
+CACHE_TTLS = {"time": 86400, "weather": 1800, "channel": 31536000}
+channels = [Channel(chan, RP_LIST_NUM, hub=RP_HUB) for chan in RP_CHANNELS]
+for c in channels:
+    CACHE_TTLS[c.cache_key] = 60
+scheduler = ChannelScheduler(channels, spacing=CHANNEL_SPACING)
+
+cache = FlashCache(microcontroller.nvm, CACHE_TTLS)
+# the UTC offset is kept even when stale: with it, the first Date header
+# sets the clock without a time API call
+clock = ClockService(cache.get("time"))
+channel = channels[min(cache.get("channel", 0), len(channels) - 1)]  # the one on screen
+profiler = Profiler()
+
+# ------------- WifI Connection ------------- #
+# Set up by init_network() once the screen is up; resetting the ESP32
+# alone takes most of a second
+wifi = None
+connections = None
+fetcher = None
+
+
+def init_network():
+    """ bring up the ESP32 and the HTTP stack """
+    global wifi, connections, fetcher
+    # Get wifi details and more from a settings.toml file
+    # tokens used by this Demo: CIRCUITPY_WIFI_SSID, CIRCUITPY_WIFI_PASSWORD
+    # If you are using a board with pre-defined ESP32 Pins:
+    esp32_cs = DigitalInOut(board.ESP_CS)
+    esp32_ready = DigitalInOut(board.ESP_BUSY)
+    esp32_reset = DigitalInOut(board.ESP_RESET)
+
+    # Secondary (SCK1) SPI used to connect to WiFi board on Arduino Nano Connect RP2040
+    if "SCK1" in dir(board):
+        spi = busio.SPI(board.SCK1, board.MOSI1, board.MISO1)
+    else:
+        spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
+    esp = adafruit_esp32spi.ESP_SPIcontrol(spi, esp32_cs, esp32_ready, esp32_reset)
+
+    status_pixel = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.2)
+    ssid = getenv("CIRCUITPY_WIFI_SSID")
+    password = getenv("CIRCUITPY_WIFI_PASSWORD")
+
+    wifi = WiFiManager(esp, ssid, password, status_pixel=status_pixel)
+    # keeps the TLS sockets to each API host open between polls
+    connections = ConnectionPool(wifi)
+    # the radio sleeps between polls; a request brings it back first
+    fetcher = FetchEngine(connections, before_reload=lambda: cache.flush(force=True),
+                          on_headers=clock.observe_headers, wake=power.warm_up,
+                          profiler=profiler)
+    power.attach_radio(esp, esp32_reset, connections)
+    connections.wake = power.radio_needed  # in case a request finds it down anyway
+
 
 # ------------- Functions ------------- #
 # Backlight function
@@ -93,16 +168,9 @@ def set_backlight(val):
     board.DISPLAY.brightness = val
 
 
-# Set visibility of layer
-def layerVisibility(state, layer, target):
-    try:
-        if state == "show":
-            time.sleep(0.1)
-            layer.append(target)
-        elif state == "hide":
-            layer.remove(target)
-    except ValueError:
-        pass
+DISPLAY_SLEEP = 300  # seconds without a touch before the backlight goes off
+# the backlight follows the room, the ESP32 sleeps between polls
+power = PowerManager(set_backlight, sleep_after=0 if TEXT_OUTPUT_MODE else DISPLAY_SLEEP)
 
 
 # This will handle switching Images and Icons
@@ -122,25 +190,6 @@ def set_image(group, filename):
     group.append(image_sprite)
 
 
-# return a reformatted string with word wrapping using PyPortal.wrap_nicely
-def text_box(target, top, string, max_chars):
-    # text = pyportal.wrap_nicely(string, max_chars)
-    text = string
-    new_text = ""
-    test = ""
-
-    for w in text:
-        new_text += "\n" + w
-        test += "M\n"
-
-    text_height = Label(font, text="M", color=0x03AD31)
-    text_height.text = test  # Odd things happen without this
-    glyph_box = text_height.bounding_box
-    target.text = ""  # Odd things happen without this
-    target.y = int(glyph_box[3] / 2) + top
-    target.text = new_text
-
-
 def get_Temperature(source):
     if source:  # Only if we have the temperature sensor
         celsius = source.temperature
@@ -156,32 +205,11 @@ def get_time():
     return f"{time_now.tm_hour:02d}:{time_now.tm_min:02d}"
 
 
-def get_json(json_url: str, error_msg: str):
-    """ simplify getting the URL
-    """
-    gc.collect()
-    # print("Using Testing path")
-    attempts = 0
-    while attempts < 5:
-        try:
-            response = wifi.get(json_url)
-            return response.json()
-        except (TimeoutError,
-                RuntimeError,
-                adafruit_requests.OutOfRetries) as e:
-            if attempts == 4:
-                import supervisor
-                supervisor.reload()
-            print(f"attempt {attempts} for {error_msg}: {e}")
-            attempts += 1
-            time.sleep(2)
-
-
-def set_time():
-    """ Routine to set the time
+async def set_time():
+    """ Routine to set the time from the time API, including the UTC offset
     """
 
-    json = get_json(TIME_API, "get time")
+    json = await fetcher.get_fields(TIME_API, TIME_FIELDS, "get time")
     if not json:
         print("Failed to get time")
         return
@@ -191,26 +219,42 @@ def set_time():
         year, month, mday = (int(x) for x in the_date.split("-"))
         the_time = the_time.split(".")[0]
         hours, minutes, seconds = (int(x) for x in the_time.split(":"))
-        year_day = json["day_of_year"]
-        week_day = json["day_of_week"]
-        is_dst = json["dst"]
-
-        now = time.struct_time((year, month, mday, hours, minutes, seconds, week_day, year_day, is_dst))
-        print(now)
-        the_rtc = rtc.RTC()
-        the_rtc.datetime = now
+        sign = -1 if json["utc_offset"][0] == "-" else 1
+        offset_hours, offset_minutes = (int(x) for x in json["utc_offset"][1:].split(":"))
+        utc_offset = sign * (offset_hours * 3600 + offset_minutes * 60)
+
+        local = epoch(year, month, mday, hours, minutes, seconds)
+        clock.set_time(local - utc_offset, utc_offset)
+        print(time.localtime())
+        cache.put("time", utc_offset)
     except Exception as e:
         print(f"set_error: error occurred: {e}")
         print("Failed to get time")
 
 
-def get_music(response_type: str = 'str') -> str:
-    """ retrieve the music and return a string
+async def get_music(response_type: str = 'str', source=None) -> str:
+    """ retrieve the music of a channel (the one on screen by default)
+    and return a string
     """
-    response = get_json(RP_URL, "get music")
+    source = source or channel
+    # the hub tags its songs, so an unchanged list comes back as a bodiless 304
+    response = await fetcher.get_fields(source.url, SONG_PATHS, "get music " + source.name,
+                                        cached=bool(RP_HUB))
     if response:
-        val = response["song"]
-        item = val[0]
+        songs = []
+        for i in range(RP_LIST_NUM):
+            fields = SONG_FIELDS if i == 0 else HISTORY_FIELDS
+            song = {}
+            for name in fields:
+                song[name] = response.get(f"song[{i}].{name}")
+            if song["title"] is None:
+                break
+            songs.append(song)
+        if not songs:
+            return "Error"
+        item = songs[0]
+        if response_type == "list":
+            return songs
         if response_type == "str":
             return (f"Song:{item['title']} Artist:{item['artist']} Album:{item['album']} Year:{item['year']} Rating:{item['listener_rating']}")
         elif response_type == "simple":
@@ -223,48 +267,43 @@ def get_fahrenheit(celsius: float) -> float:
     """ convert temperature to fahrenheit"""
     return (celsius * 9/5) + 32
 
-def get_weather() -> str:
+async def get_weather() -> str:
     """ retrieve the weather"""
-    response = get_json(WEATHER, "get weather")
+    # observations change about hourly; the cache headers say when to ask again
+    response = await fetcher.get_fields(WEATHER, (WEATHER_TEMPERATURE,), "get weather",
+                                        cached=True)
     if response:
         try:
-            temp = response['properties']['temperature']['value']
+            temp = response[WEATHER_TEMPERATURE]
             temp_float = float(temp)
             temp_far = get_fahrenheit(temp_float)
             result = f"{temp_far:.1f} F {temp} C"
             return result
         except (KeyError, TypeError) as e:
             print(f"value error {e}")
-    return "failed to get weather"
+    return WEATHER_FAILED
 
 
 last_time = 0
 interval_info = [0, time.time(), [10, 30]]
 
-def interval_sequence() -> tuple[bool, int]:
+def interval_sequence():
     """ advance frame by set number of seconds
-        return the next interval
-        
+        return the next interval, or None while the current one runs
+
         interval_info[0] is the current interval
         interval_info[1] is the last time
-        :rtype: tuple[bool, int]
+        Called every render pass, so it allocates nothing when it
+        returns None.
+        :rtype: int or None
     """
-    
-    def next_interval(current_interval, last_interval):
-        if current_interval == last_interval-1:
-            return 0
-        return current_interval + 1
-    
-    global interval_info
     interval_list = interval_info[2]
     delta = time.time() - interval_info[1]
     if delta > interval_list[interval_info[0]]:
-        interval_info[0] = next_interval(interval_info[0], len(interval_list))
+        interval_info[0] = (interval_info[0] + 1) % len(interval_list)
         interval_info[1] = time.time()
-        return True, interval_info[0]
-    return False, interval_info[0]
-        
-    # current interval is interval
+        return interval_info[0]
+    return None
 
 
 def interval_elapsed(interval: int = 30):
@@ -277,29 +316,56 @@ def interval_elapsed(interval: int = 30):
     return False
 
 # ------------- Inputs and Outputs Setup ------------- #
-light_sensor = AnalogIn(board.LIGHT)
-try:
-    # attempt to init. the temperature sensor
-    i2c_bus = busio.I2C(board.SCL, board.SDA)
-    adt = adafruit_adt7410.ADT7410(i2c_bus, address=0x48)
-    adt.high_resolution = True
-except ValueError:
-    # Did not find ADT7410. Probably running on Titano or Pynt
-    adt = None
+# Set up by init_hardware() once the screen is up
+light_sensor = None
+adt = None
+ts = None
+touch_input = None
+
+
+def init_hardware():
+    """ probe the sensors and set up the touchscreen """
+    global light_sensor, adt, ts, touch_input
+    light_sensor = AnalogIn(board.LIGHT)
+    try:
+        # attempt to init. the temperature sensor
+        i2c_bus = busio.I2C(board.SCL, board.SDA)
+        adt = adafruit_adt7410.ADT7410(i2c_bus, address=0x48)
+        adt.high_resolution = True
+    except ValueError:
+        # Did not find ADT7410. Probably running on Titano or Pynt
+        adt = None
+    if not TEXT_OUTPUT_MODE:
+        # Touchscreen setup
+        ts = adafruit_touchscreen.Touchscreen(
+            board.TOUCH_XL, board.TOUCH_XR,
+            board.TOUCH_YD, board.TOUCH_YU,
+            calibration=((5200, 59000), (5800, 57000)),
+            size=(320, 240))
+        touch_input = TouchInput(ts, regions)
+
+
+def last_known_frame() -> str:
+    """ the cached time, weather and track, for the splash screen """
+    lines = []
+    if clock.is_set:
+        lines.append(get_time())
+    if cache.get("weather"):
+        lines.append(cache.get("weather"))
+    song = cache.get(channel.cache_key)
+    if song:
+        lines.append(f"{song['title']} - {song['artist']}")
+    return "\n".join(lines) or "Starting..."
+
 
 # ------------- Screen Setup ------------- #
 # pyportal = PyPortal()
 # pyportal.set_background("/images/loading.bmp")  # Display an image until the loop starts
+boot.stage("splash")
 
 if not TEXT_OUTPUT_MODE:
-    # Touchscreen setup  
     display = board.DISPLAY
-    set_backlight(0.3)
-    ts = adafruit_touchscreen.Touchscreen(
-        board.TOUCH_XL, board.TOUCH_XR,
-        board.TOUCH_YD, board.TOUCH_YU,
-        calibration=((5200, 59000), (5800, 57000)),
-        size=(320, 240))
+    set_backlight(0.3)  # until the light sensor is read
 
 
 # ------------- Display Groups ------------- #
@@ -307,6 +373,7 @@ splash = displayio.Group()  # The Main Display Group
 view1 = displayio.Group()  # Group for View 1 objects
 view2 = displayio.Group()  # Group for View 2 objects
 view3 = displayio.Group()  # Group for View 3 objects
+view4 = displayio.Group()  # Group for View 4 objects
 
 # ------------- Setup for Images ------------- #
 if not TEXT_OUTPUT_MODE:
@@ -315,33 +382,77 @@ if not TEXT_OUTPUT_MODE:
     set_image(bg_group, "/images/BGimage.bmp")
 
 icon_group = displayio.Group()
-icon_group.x = 180
-icon_group.y = 120
+icon_group.x = TABS_X + 4  # bottom left, clear of the track text and the rating
+icon_group.y = SCREEN_HEIGHT - ART_SIZE - 4
 icon_group.scale = 1
 view2.append(icon_group)
 
+# The last known frame in the built-in font, shown while the rest loads
+boot_label = Label(terminalio.FONT, text=last_known_frame(), color=0xE39300, scale=2)
+boot_label.x = TABS_X + 8
+boot_label.y = TABS_Y + 20
+splash.append(boot_label)
+if not TEXT_OUTPUT_MODE:
+    board.DISPLAY.root_group = splash
+boot.first_pixel()
+boot.stage("ui")
+
 # ---------- Text Boxes ------------- #
-# Set the font and preload letters
+# Fonts are opened here but their glyphs are only read when a view first
+# needs them; glyphs parsed once are kept in /glyphs
 # source https://github.com/olikraus/u8g2/tree/master/tools/font/bdf
 #
+PRELOAD = "abcdefghjiklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890- ()'&.,:!?/°"
+TAB_LABELS = "TimeMusicSensorRecent"
+glyphs = GlyphManager()
 font = bitmap_font.load_font("/fonts/Helvetica-Bold-16.bdf")
-font.load_glyphs(b"abcdefghjiklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890- ()")
 font_large = bitmap_font.load_font("/fonts/helvB24.bdf")
-font_large.load_glyphs(b"abcdefghjiklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890- ()")
 font_mid = bitmap_font.load_font("/fonts/luBS19.bdf")
-font_mid.load_glyphs(b"abcdefghjiklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890- ()")
+FONT_NAMES = {font: "Helvetica-Bold-16", font_large: "helvB24", font_mid: "luBS19"}
+VIEW_FONTS = {1: (font_mid,), 2: (font_mid, font_large, font), 3: (font,), 4: (font,)}
+ready_fonts = []
+ready_views = []
+layout = TextLayout(glyphs=glyphs)
+
+
+def use_font(target, text=PRELOAD):
+    """ restore target's cached glyphs the first time, then load what text needs """
+    if target not in ready_fonts:
+        glyphs.add_font(target, FONT_NAMES[target])
+        ready_fonts.append(target)
+    glyphs.prepare(text, target)
+
+
+def prepare_view(what_view):
+    """ load the fonts a view uses the first time it is shown """
+    if what_view in ready_views:
+        return
+    with profiler.phase("fonts"):
+        for target in VIEW_FONTS[what_view]:
+            use_font(target)
+    ready_views.append(what_view)
+
+
+use_font(font, TAB_LABELS)
+prepare_view(1)
 # Text Label Objects
 time_data = Label(font_mid, text="Time Data", color=0xE39300)
 time_data.x = TABS_X + 2
 time_data.y = TABS_Y + 10
 view1.append(time_data)
 
-music_data = Label(font_mid, text="Music Data", color=0xFFFFFF)
-music_data.x = TABS_X + 2
-music_data.y = TABS_Y
-view2.append(music_data)
-
-music_rating = Label(font_large, text="0", color=0xFFFFFF, 
+# views 2 and 3 are filled in when they are first shown
+# title, artist and album+year, one line each; lines too long scroll
+MUSIC_TOP = TABS_Y + 18
+music_phase = profiler.phase("marquee")
+music_lines = [Marquee(font_mid, SCREEN_WIDTH - TABS_X - 2, color=0xFF7E00, phase=music_phase)
+               for _ in range(3)]
+for i, line in enumerate(music_lines):
+    line.group.x = TABS_X + 2
+    line.group.y = MUSIC_TOP + i * line.height
+    view2.append(line.group)
+
+music_rating = Label(font_large, text="", color=0xFFFFFF, 
     padding_right=8,
     padding_top=8,
     padding_bottom=8,
@@ -350,16 +461,45 @@ music_rating.anchor_point = (1.0, 1.0)
 music_rating.anchored_position = (SCREEN_WIDTH - 20, SCREEN_HEIGHT - 20)
 view2.append(music_rating)
 
-sensors_label = Label(font, text="Data View", color=0x03AD31)
+channel_label = Label(font, text="", color=0x03AD31)
+channel_label.anchor_point = (1.0, 0.0)
+channel_label.anchored_position = (SCREEN_WIDTH - 4, TABS_Y + 2)
+view2.append(channel_label)
+
+sensors_label = Label(font, text="", color=0x03AD31)
 sensors_label.x = TABS_X
 sensors_label.y = TABS_Y
 view3.append(sensors_label)
 
-sensor_data = Label(font, text="Data View", color=0x03AD31)
+sensor_data = Label(font, text="", color=0x03AD31)
 sensor_data.x = TABS_X + 16  # Indents the text layout
 sensor_data.y = 150
 view3.append(sensor_data)
 
+# Sensors are read at their own rates into fixed-size histories; the
+# sparklines get one column per minute (the minute's mean)
+LIGHT_PERIOD = 1  # seconds between light sensor reads
+TEMP_PERIOD = 10  # seconds between temperature reads
+SPARK_WIDTH = 240  # minutes of graph
+SPARK_HEIGHT = 32
+light_series = Series("light", lambda: light_sensor.value, LIGHT_PERIOD)
+temp_series = Series("temp", lambda: get_Temperature(adt), TEMP_PERIOD)
+sampler = Sampler([light_series, temp_series])
+light_spark = Sparkline(SPARK_WIDTH, SPARK_HEIGHT, 0, 65535, 0xFFFF00)
+temp_spark = Sparkline(SPARK_WIDTH, SPARK_HEIGHT, 40, 100, 0xFF7E00)
+light_series.on_minute = light_spark.push
+temp_series.on_minute = temp_spark.push
+light_spark.grid.x = temp_spark.grid.x = TABS_X + 16
+light_spark.grid.y = TABS_Y + 20
+temp_spark.grid.y = light_spark.grid.y + SPARK_HEIGHT + 8
+view3.append(light_spark.grid)
+view3.append(temp_spark.grid)
+
+recent_data = Label(font, text="", color=0xFFFFFF, line_spacing=1.0)
+recent_data.x = TABS_X + 2
+recent_data.y = TABS_Y + 20
+view4.append(recent_data)
+
 # ---------- Display Buttons ------------- #
 # This group will make it easy for us to read a button press later.
 buttons = []
@@ -413,38 +553,45 @@ button_view3 = Button(
 )
 buttons.append(button_view3)  # adding this button to the buttons group
 
+button_view4 = Button(
+    x=TAB_BUTTON_WIDTH * 3,  # Start after width of 3 buttons
+    y=0,
+    width=TAB_BUTTON_WIDTH,
+    height=TABS_Y,
+    label="Recent",
+    label_font=font,
+    label_color=0xFF7E00,
+    fill_color=0x5C5B5C,
+    outline_color=0x767676,
+    selected_fill=0x1A1A1A,
+    selected_outline=0x2E2E2E,
+    selected_label=0x525252,
+)
+buttons.append(button_view4)  # adding this button to the buttons group
+
 
 # Add main buttons to the splash Group
 for b in buttons:
     splash.append(b)
 
+# Touch regions: each tab maps to the number of the view it shows
+regions = RegionMap(SCREEN_WIDTH, SCREEN_HEIGHT)
+for i, b in enumerate(buttons):
+    regions.add_button(i + 1, b)
+# tapping the music view below the tabs moves to the next channel
+NEXT_CHANNEL = "channel"
+if len(channels) > 1:
+    regions.add(NEXT_CHANNEL, 0, TABS_Y, SCREEN_WIDTH, SCREEN_HEIGHT - TABS_Y)
+
+# Every view stays attached to splash; switching only hides and unhides
+views = ViewManager(splash, profiler.phase("switch"))
+
 
 # pylint: disable=global-statement
 def switch_view(what_view):
     global view_live
-    if what_view == 1:
-        button_view1.selected = False
-        button_view2.selected = True
-        button_view3.selected = True
-        layerVisibility("hide", splash, view2)
-        layerVisibility("hide", splash, view3)
-        layerVisibility("show", splash, view1)
-    elif what_view == 2:
-        # global icon
-        button_view1.selected = True
-        button_view2.selected = False
-        button_view3.selected = True
-        layerVisibility("hide", splash, view1)
-        layerVisibility("hide", splash, view3)
-        layerVisibility("show", splash, view2)
-    else:
-        button_view1.selected = True
-        button_view2.selected = True
-        button_view3.selected = False
-        layerVisibility("hide", splash, view1)
-        layerVisibility("hide", splash, view2)
-        layerVisibility("show", splash, view3)
-
+    if not views.show(what_view):
+        return
     # Set global button state
     view_live = what_view
     print("View {view_num:.0f} On".format(view_num=what_view))
@@ -452,67 +599,44 @@ def switch_view(what_view):
 
 # pylint: enable=global-statement
 
-# Set variables and startup states
-button_view1.selected = False
-button_view2.selected = True
-button_view3.selected = True
-# button_switch.label = "OFF"
-# button_switch.selected = True
-
-layerVisibility("show", splash, view1)
-layerVisibility("hide", splash, view2)
-layerVisibility("hide", splash, view3)
-
-# Update out Labels with display text.
-# text_box(
-#     time_data,
-#     TABS_Y + 5,
-#     get_time(),
-#     30,
-# )
-
-# text_box(feed2_label, TABS_Y, "Tap on the Icon button to meet a new friend.", 18)
-# text_box(
-#     sensors_label,
-#     TABS_Y + 20,
-#     "This screen can display sensor readings and tap Sound to play a WAV file.",
-#     28,
-# )
+# Latest results from the fetch tasks; the render side only reads these
+weather_text = ""
+music_info = None
+view = ViewModel()
+weather_wanted = asyncio.Event()
+art_wanted = asyncio.Event()
+music_wanted = asyncio.Event()  # set to re-plan the polls, e.g. for a new channel
+music_scroll = asyncio.Event()  # set when the music lines may need scrolling
+RECENT_LINES = 8  # tracks that fit on the recently played view
+covers = CoverCache(size=ART_SIZE, phase=profiler.phase("cover"))
 
 
 def update_weather_panel():
-    weather_text = get_weather()
-    time_data.text = get_time() + "\n" + weather_text
+    view.text(time_data, get_time() + "\n" + weather_text)
 
 def update_rating(rating):
     """ update the rating """
+    colors = None
     if rating < 3:
-        music_rating.color = 0xFF0000  # red
-        music_rating.background_color = 0xFFFF00
+        colors = (0xFF0000, 0xFFFF00)  # red
     elif rating < 4:
-        music_rating.color = 0xFF8000  # orange
-        music_rating.background_color = 0xFF0000
+        colors = (0xFF8000, 0xFF0000)  # orange
     elif rating < 5:
-        music_rating.color = 0xFFFF00  # yellow
-        music_rating.background_color = 0x0000EE
+        colors = (0xFFFF00, 0x0000EE)  # yellow
     elif rating < 6:
-        music_rating.color = 0x00FF00  # green
-        music_rating.background_color = 0x0000FF
+        colors = (0x00FF00, 0x0000FF)  # green
     elif rating < 7:
-        music_rating.color = 0x0000FF  # blue
-        music_rating.background_color = 0xFFFF00
+        colors = (0x0000FF, 0xFFFF00)  # blue
     elif rating < 8:
-        music_rating.color = 0x4B0082  # indigo
-        music_rating.background_color = 0xFFFF00
+        colors = (0x4B0082, 0xFFFF00)  # indigo
     elif rating < 9:
-        music_rating.color = 0x8000FF  # violet
-        music_rating.background_color = 0xFFFF00
-    music_rating.text = str(rating)
+        colors = (0x8000FF, 0xFFFF00)  # violet
+    if colors:
+        view.color(music_rating, *colors)
+    view.text(music_rating, str(rating))
 
 
 def update_music() -> None:
-    music_info = get_music("json")
-
     if TEXT_OUTPUT_MODE:
         # Console text output mode
         if music_info:
@@ -526,82 +650,394 @@ def update_music() -> None:
             print("Music loading error")
     else:
         # PyPortal display output mode
-        text_height = Label(font, text="M", color=0x03AD31)
-        text_height.text = "M\n"  # Odd things happen without this
-        glyph_box = text_height.bounding_box
-        music_data.text = ""  # Odd things happen without this
-        music_data.y = int(glyph_box[3] / 2) + TABS_Y + 20
-        music_data.color = 0xFF7E00
         if music_info:
-            music_data.text = (
+            # load any new characters in one pass before drawing them
+            text = glyphs.prepare(
                 music_info['title'] + "\n" +
                 music_info['artist'] + "\n" +
-                music_info['album'] + " "  + music_info['year']
-                )
-            update_rating(music_info['listener_rating'])
+                music_info['album'] + " " + music_info['year'],
+                font_mid)
+            lines = text.split("\n")
+        else:
+            lines = ("Loading error", "", "")
+        with profiler.phase("render"):
+            # each line is drawn once; long ones then scroll in marquee_task
+            for line, text in zip(music_lines, lines):
+                line.set_text(text)
+            if music_info:
+                update_rating(music_info['listener_rating'])
+        music_scroll.set()
+
+def update_recent():
+    """ list the recently played tracks, newest first """
+    tracks = channel.history.recent(RECENT_LINES)
+    if not tracks:
+        view.text(recent_data, "Nothing played yet")
+        return
+    with profiler.phase("layout"):
+        width = SCREEN_WIDTH - recent_data.x - 4
+        lines = []
+        for track in tracks:
+            when = ""
+            if track.start is not None and clock.utc_offset is not None:
+                local = time.localtime(track.start + clock.utc_offset)
+                when = f"{local.tm_hour:02d}:{local.tm_min:02d} "
+            line = glyphs.prepare(f"{when}{track.artist} - {track.title}", font)
+            lines.append(layout.truncate(font, line, width))
+    with profiler.phase("render"):
+        view.text(recent_data, "\n".join(lines), clear=True)
+
+# ------------- Tasks ------------- #
+IDLE_FPS = 10  # touch samples per second with nobody at the screen
+ACTIVE_FPS = 50  # touch samples per second just after a touch
+BOOST_SECONDS = 3  # how long a touch keeps the faster rate
+RENDER_PERIOD = 0.1  # seconds between sensor/rotation updates
+REPORT_INTERVAL = 60  # seconds between latency reports on the console
+CLOCK_PERIOD = 60  # seconds between clock corrections
+WEATHER_MIN = 60  # least seconds between weather refreshes, whatever the headers say
+WEATHER_MAX = 1800  # most seconds between weather refreshes
+LIGHT_STEP = 256  # light sensor changes smaller than this are not redrawn
+MARQUEE_FPS = 25  # scroll steps per second for long music lines
+
+# touch-to-view-switch latency
+touch_stats = {"last_ms": 0, "max_ms": 0}
+governor = FrameGovernor(IDLE_FPS, ACTIVE_FPS, BOOST_SECONDS)
+marquee_frames = FrameGovernor(MARQUEE_FPS, MARQUEE_FPS)
+
+
+async def time_task():
+    """ keep the RTC right; the time API is only the fallback
+
+    Date headers on the other responses set and trim the clock.  The API is
+    asked when the UTC offset is unknown, the headers stop coming, or once
+    a day so daylight saving changes are picked up.
+    """
+    while True:
+        if clock.needs_resync() or (clock.is_set and not cache.fresh("time")):
+            await set_time()
+        clock.tick()
+        if view_live == 1:
+            update_weather_panel()
+        await asyncio.sleep(CLOCK_PERIOD)
+
+
+weather_due = None  # monotonic time weather_task refreshes the time view's weather
+
+
+async def weather_task():
+    """ fetch the weather when the time view asks, and again while it is
+    shown once the cached observation expires (as hub.py clamps it), or
+    once the breaker allows a retry after a failure """
+    global weather_text, weather_due
+    wait = None  # until the first fetch, only when asked
+    while True:
+        if view_live != 1 or wait is None:
+            weather_due = None
+        else:
+            weather_due = time.monotonic() + wait
+        try:
+            await asyncio.wait_for(weather_wanted.wait(), None if weather_due is None else wait)
+        except asyncio.TimeoutError:
+            if view_live != 1:
+                continue
+        weather_wanted.clear()
+        text = await get_weather()
+        if text != WEATHER_FAILED:
+            weather_text = text
+            cache.put("weather", text)
+            boot.first_data("weather")
+            wait = min(max(fetcher.http_cache.expires_in(WEATHER) or 0, WEATHER_MIN), WEATHER_MAX)
+        else:
+            wait = max(fetcher.breaker(WEATHER).retry_in(), WEATHER_MIN)
+        if view_live == 1:
+            update_weather_panel()
+
+
+async def music_task():
+    """ poll each channel just after its track ends, one poll at a time """
+    global music_info
+    for c in channels:
+        if c.info and cache.fresh(c.cache_key):
+            # painted from the cache; wait for the cached track to end
+            c.schedule.resume(c.info)
+            scheduler.schedule(c, c.schedule.delay(clock.now_utc()))
+    while True:
+        source, wait = scheduler.next()
+        if wait > 0:
+            try:
+                await asyncio.wait_for(music_wanted.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            music_wanted.clear()
+            continue  # the plan may have changed meanwhile
+        songs = await get_music("list", source)
+        if songs != "Error":
+            info = songs[0]
+            merged = source.history.merge(songs)
+            changed = source.schedule.update(info, clock.now_utc())
+            source.info = info
+            cache.put(source.cache_key, info)
+            if source is channel:
+                music_info = info
+                boot.first_data("music")
+                if merged and view_live == 4:
+                    update_recent()
+                if changed:
+                    art_wanted.set()
+                    if view_live == 2:
+                        update_music()
         else:
-            music_data.text = "Loading error"
+            source.schedule.failed()
+        scheduler.polled(source, source.schedule.delay(clock.now_utc()))
+
+
+def next_channel():
+    """ show the next channel, straight from what is already known of it """
+    global channel, music_info
+    channel = channels[(channels.index(channel) + 1) % len(channels)]
+    music_info = channel.info
+    cache.put("channel", channels.index(channel))
+    if music_info is None:
+        scheduler.hurry(channel)
+        music_wanted.set()
+    print(f"channel {channel.chan} {channel.name}")
+    art_wanted.set()
+    if view_live == 2:
+        fill_music_view()
+    elif view_live == 4:
+        update_recent()
+
+
+async def art_task():
+    """ show the current track's cover, from the cover cache when it can """
+    shown = None
+    while True:
+        await art_wanted.wait()
+        art_wanted.clear()
+        cover = music_info.get("cover_small") if music_info else None
+        if not cover:
+            continue
+        key = cover.rsplit("/", 1)[-1].split(".")[0]
+        if key == shown:
+            continue
+        path = covers.lookup(key) or await covers.fetch(fetcher, COVER_URL + cover, key, shown)
+        try:
+            set_image(icon_group, path)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"cover {key}: {e}")
+            covers.discard(key)  # fetched again next time
+            path = None
+        shown = key if path else None
+
+
+def fill_time_view():
+    prepare_view(1)
+    update_weather_panel()
+
+
+def fill_music_view():
+    prepare_view(2)
+    if len(channels) > 1:
+        view.text(channel_label, channel.name)
+    update_music()
+    for line in music_lines:
+        line.restart()
+
+
+def fill_recent_view():
+    prepare_view(4)
+    update_recent()
+
+
+def fill_sensor_view():
+    prepare_view(3)
+    view.text(sensors_label, "Data View")
+
+
+def show_view(what_view):
+    """ switch to a view, refreshing the weather when it is the time view """
+    if what_view == 1:
+        weather_wanted.set()
+    switch_view(what_view)
+
+
+def handle_touch(what_view, touched_ns):
+    """ switch to the view whose tab was pressed """
+    if what_view is None or what_view == view_live:
+        return
+    print("button{} pressed".format(what_view - 1))
+    # pyportal.play_file(soundTab)
+    show_view(what_view)
+    latency_ms = (time.monotonic_ns() - touched_ns) // 1000000
+    touch_stats["last_ms"] = latency_ms
+    touch_stats["max_ms"] = max(touch_stats["max_ms"], latency_ms)
+
+
+async def touch_task():
+    """ sample the touchscreen at the governed rate and act on the press events """
+    phase = profiler.phase("touch")
+    while True:
+        with phase:
+            touch_input.sample()
+        if touch_input.touching:
+            governor.boost()  # sample the rest of the press at the faster rate
+        for kind, region, _, touched_ns in touch_input.events():
+            if kind == PRESS and power.touched():
+                music_scroll.set()
+                continue  # the touch that wakes the screen does nothing else
+            if kind == PRESS and region == NEXT_CHANNEL:
+                if view_live in (2, 4):
+                    next_channel()
+            elif kind == PRESS:
+                handle_touch(region, touched_ns)
+        await governor.frame()
+
+
+def serial_command():
+    """ a character typed on the serial console, if any (CircuitPython only) """
+    try:
+        import supervisor
+        if supervisor.runtime.serial_bytes_available:
+            return sys.stdin.read(1)
+    except (ImportError, AttributeError):
+        pass
+    return None
+
+
+async def sensor_task():
+    """ read each sensor when it is due """
+    while True:
+        await asyncio.sleep(sampler.poll())
+
+
+async def marquee_task():
+    """ scroll the long music lines while they are on screen """
+    while True:
+        await music_scroll.wait()
+        music_scroll.clear()
+        marquee_frames.resume()
+        while view_live == 2 and not power.asleep:
+            moving = False
+            for line in music_lines:
+                if line.scrolling:
+                    moving = True
+                    line.step()
+            if not moving:
+                break
+            await marquee_frames.frame()
+
+
+async def power_task():
+    """ backlight from the light sensor, display sleep, radio between polls """
+    while True:
+        if not TEXT_OUTPUT_MODE and light_series.count:
+            power.ambient(light_series.latest)
+        power.tick()
+        if fetcher:
+            next_fetch = scheduler.next()[1]
+            if weather_due is not None:
+                next_fetch = min(next_fetch, max(weather_due - time.monotonic(), 0))
+            if power.plan(next_fetch, fetcher.busy):
+                await power.warm_up()
+        await asyncio.sleep(1)
+
+
+async def render_task():
+    last_report = time.monotonic()
+    while True:
+        if view_live == 3 and temp_series.count:
+            reading = (touch_input.point if not TEXT_OUTPUT_MODE else None,
+                       quantize(light_series.latest, LIGHT_STEP),
+                       round(temp_series.latest))
+            if view.stale(sensor_data, reading):
+                view.text(sensor_data, "Touch: {}\nLight: {}\nTemp: {:.0f}°F".format(*reading))
+
+        #time_data.text = "Time {}".format(get_time())
+
+        next_panel = interval_sequence()
+        if next_panel is not None:
+            show_view(next_panel + 1)
+
+        if serial_command() == "p":
+            print(profiler.stats())
+        if time.monotonic() - last_report > REPORT_INTERVAL:
+            last_report = time.monotonic()
+            profiler.collect()
+            print(f"touch: last {touch_stats['last_ms']} ms max {touch_stats['max_ms']} ms")
+            if not TEXT_OUTPUT_MODE:
+                print(touch_input.stats())
+                print(governor.stats())
+            print(boot.stats())
+            print(fetcher.stats())
+            print(fetcher.http_cache.stats())
+            print(fetcher.health())
+            print(connections.stats())
+            print(scheduler.stats())
+            print(channel.schedule.stats())
+            print(channel.history.stats())
+            print(cache.stats())
+            print(sampler.stats())
+            print(power.stats())
+            print(covers.stats())
+            print(view.stats())
+            print(views.stats())
+            for line in music_lines:
+                print(line.stats())
+            print("marquee " + marquee_frames.stats())
+            print(glyphs.stats())
+            print(layout.stats())
+            print(clock.stats())
+            print(profiler.stats())
+        await asyncio.sleep(RENDER_PERIOD)
+
+
+async def cache_task():
+    """ let the cache write out coalesced changes """
+    while True:
+        await asyncio.sleep(60)
+        cache.flush()
+
 
 # ------------- Initialization ------------- #
-if not TEXT_OUTPUT_MODE:
-    board.DISPLAY.root_group = splash
+# Paint the last good results right away, then refresh in the background
+weather_text = cache.get("weather", "")
+for c in channels:
+    c.info = cache.get(c.cache_key)
+    if c.info:
+        c.history.merge([c.info])
+music_info = channel.info
+views.add(1, view1, button_view1, fill_time_view)
+views.add(2, view2, button_view2, fill_music_view)
+views.add(3, view3, button_view3, fill_sensor_view)
+views.add(4, view4, button_view4, fill_recent_view)
+switch_view(1)
+splash.remove(boot_label)  # view 1 now shows the same, in its own font
+if TEXT_OUTPUT_MODE:
+    update_music()
 last_time = time.time()
-set_time()
-update_weather_panel()
 
-# ------------- Code Loop ------------- #
-while True:
-    touch = ts.touch_point
-    light = light_sensor.value
 
-    sensor_data.text = "Touch: {}\nLight: {}\nTemp: {:.0f}°F".format(
-        touch, light, get_Temperature(adt)
-        )
+async def main():
+    # the screen is up; let the UI run while the slow parts start
+    boot.stage("hardware")
+    init_hardware()
+    ui_tasks = [asyncio.create_task(sensor_task()), asyncio.create_task(render_task()),
+                asyncio.create_task(power_task())]
+    if not TEXT_OUTPUT_MODE:
+        ui_tasks.append(asyncio.create_task(touch_task()))
+        ui_tasks.append(asyncio.create_task(marquee_task()))
+    await asyncio.sleep(0)
+    boot.stage("network")
+    init_network()
+    boot.stage(None)
+    if not cache.fresh("weather"):
+        weather_wanted.set()
+    tasks = [time_task(), weather_task(), music_task(), cache_task()]
+    if not TEXT_OUTPUT_MODE and covers.enabled:
+        art_wanted.set()
+        tasks.append(art_task())
+    await asyncio.gather(*tasks, *ui_tasks)
 
-    #time_data.text = "Time {}".format(get_time())
-
-    interval_advance, next_panel = interval_sequence()
-    if interval_advance:
-        if next_panel == 0:
-            update_weather_panel()
-            switch_view(1)
-        elif next_panel == 1:
-            update_music()
-            switch_view(2)
-
-    # Only update music data at specified interval (default 30 seconds)
-    # if interval_elapsed(30):
-    #     update_music()
-    #     if view_live != 2 and not TEXT_OUTPUT_MODE:
-    #         switch_view(2)
-        # else:
-        #     switch_view(1)
-
-#    time.sleep(0.1)  # Short sleep for responsive UI
-
-
-
-    # ------------- Handle Button Press Detection  ------------- #
-    if touch and not TEXT_OUTPUT_MODE:  # Only do this if the screen is touched
-        # loop with buttons using enumerate() to number each button group as i
-        for i, b in enumerate(buttons):
-            if b.contains(touch):  # Test each button to see if it was pressed
-                print("button{} pressed".format(i))
-                if i == 0 and view_live != 1:  # only if view1 is visible
-                    # pyportal.play_file(soundTab)
-                    switch_view(1)
-                    while ts.touch_point:
-                        pass
-                if i == 1 and view_live != 2:  # only if view2 is visible
-                    # pyportal.play_file(soundTab)
-                    update_music()
-                    switch_view(2)
-                    while ts.touch_point:
-                        pass
-                if i == 2 and view_live != 3:  # only if view3 is visible
-                    # pyportal.play_file(soundTab)
-                    switch_view(3)
-                    while ts.touch_point:
-                        pass
-                # if i == 3:  EtC
 
+# ------------- Code Loop ------------- #
+asyncio.run(main())
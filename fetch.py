@@ -0,0 +1,282 @@
+# Cooperative HTTP fetching for the PyPortal display
+#
+# SPDX-License-Identifier: MIT
+import time
+import random
+import asyncio
+
+import adafruit_requests
+
+from breaker import CircuitBreaker
+from httpcache import HttpCache
+from jsonstream import PathExtractor
+from perf import Profiler
+
+
+class StatusError(Exception):
+    """ the server answered, but not with the status asked for """
+
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class FetchEngine:
+    """ run HTTP GETs without starving the touch and render tasks
+
+    The ESP32 co-processor still blocks while a single socket call is in
+    flight, so the body is pulled in small chunks and the engine yields
+    to the event loop between chunks and between retries: reading the
+    body costs the UI at most one chunk read at a time.  Opening the
+    request is not split up: ``wifi.get()`` blocks through DNS, the TCP
+    connect, the TLS handshake, sending the request and reading the
+    headers, which on a new connection takes seconds.  ``max block`` in
+    the stats line is the longest single blocking call seen, so the real
+    worst case.
+    Requests are serialized because the session closes the previous
+    response as soon as a new request starts, which also lets every body
+    be read into one buffer allocated up front rather than a new bytes
+    object per chunk.
+
+    Failures are handled per endpoint (host and first path segment, so
+    the hub's /music, /weather and /cover fail apart) by a CircuitBreaker:
+    while an endpoint's breaker is open its requests fail at once, without
+    touching the network, and callers keep showing their last good values.
+    Recovery escalates with the failures in a row across all hosts: each
+    failure drops that host's socket, every ``reset_after`` failures the
+    ESP32 is reset, and only when nothing has worked for ``reload_after``
+    seconds is the board reloaded.  An error status (a 404, a 503) only
+    counts on the breaker: the link that carried it works.
+        :param wifi: a ConnectionPool (anything with ``get(url)``, ``drop(host)``
+                     and ``reset()``)
+        :param chunk_size: bytes read per socket call
+        :param attempts: attempts per call while the breaker allows them
+        :param retry_delay: seconds before the first retry, doubled for each
+                            further one and jittered
+        :param reset_after: failures in a row between ESP32 resets
+        :param reload_after: seconds without any success before a reload
+        :param before_reload: called just before giving up with a reload
+        :param on_headers: called with each response's headers
+        :param wake: coroutine function awaited before each request, e.g.
+                     to bring the radio up without blocking the loop
+        :param profiler: a Profiler to record the "fetch" and "parse" phases in
+    """
+
+    def __init__(self, wifi, chunk_size=256, attempts=2, retry_delay=2, reset_after=6,
+                 reload_after=1800, before_reload=None, on_headers=None, wake=None,
+                 profiler=None):
+        self.wifi = wifi
+        profiler = profiler or Profiler()
+        self._fetch = profiler.phase("fetch")
+        self._parse = profiler.phase("parse")
+        self.before_reload = before_reload
+        self.on_headers = on_headers
+        self.wake = wake
+        self.chunk_size = chunk_size
+        self._buffer = bytearray(chunk_size)
+        self._view = memoryview(self._buffer)
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.reset_after = reset_after
+        self.reload_after = reload_after
+        self.requests = 0
+        self.failures = 0
+        self.esp_resets = 0
+        self.max_block_ms = 0  # longest single blocking call seen
+        self.http_cache = HttpCache()
+        self.breakers = {}  # "host/segment" -> CircuitBreaker
+        self._streak = 0  # failures in a row, any host
+        self._last_success = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def busy(self) -> bool:
+        """ True while a request holds the radio """
+        return self._lock.locked()
+
+    def breaker(self, url) -> CircuitBreaker:
+        """ the breaker for url's endpoint, created on first use """
+        parts = url.split("/", 4)
+        name = parts[2]
+        if len(parts) > 3:
+            name += "/" + parts[3].split("?", 1)[0]
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name)
+            self.breakers[name] = breaker
+        return breaker
+
+    def _succeeded(self, breaker):
+        breaker.success()
+        self._streak = 0
+        self._last_success = time.monotonic()
+
+    def _failed(self, breaker, escalate=True):
+        """ count a failure and take the next recovery step """
+        self.failures += 1
+        breaker.failure()
+        self.wifi.drop(breaker.name.split("/", 1)[0])  # the socket is the host's
+        if not escalate:
+            return
+        self._streak += 1
+        if time.monotonic() - self._last_success > self.reload_after:
+            if self.before_reload:
+                self.before_reload()
+            import supervisor
+            supervisor.reload()
+        if self._streak % self.reset_after == 0:
+            print(f"{self._streak} failures in a row: resetting the ESP32")
+            self.esp_resets += 1
+            self.wifi.reset()
+
+    def _rejected(self, breaker, response):
+        """ an error status: the server is unwell, the link is fine """
+        response.close()  # reads off the short error body: the socket can be reused
+        self.failures += 1
+        breaker.failure()
+        raise StatusError(response.status_code)
+
+    def _read(self, response) -> int:
+        """ read the next part of response's body into the buffer; 0 at the end """
+        size = self._timed(response._readinto, self._buffer)
+        if not size:
+            response.close()  # read to the end: the socket can be reused
+        return size
+
+    def _timed(self, func, *args, **kwargs):
+        start = time.monotonic_ns()
+        self._fetch.start()
+        result = func(*args, **kwargs)
+        self._fetch.stop()
+        block_ms = (time.monotonic_ns() - start) // 1000000
+        if block_ms > self.max_block_ms:
+            self.max_block_ms = block_ms
+        return result
+
+    async def get_fields(self, json_url: str, paths, error_msg: str, cached=False):
+        """ fetch json_url and keep only the values at paths
+
+        The body is parsed as it arrives, so the whole document is never
+        held in RAM.  Returns a dict of path to value (missing paths are
+        left out), or None when the attempts fail or the host's breaker is
+        open.  With cached, the response's cache headers are honored: no request
+        while the last result is fresh, a conditional one once it is stale.
+        Only for documents whose age does not matter to the caller (not
+        the time API).
+        """
+        if cached:
+            result = self.http_cache.fresh(json_url)
+            if result is not None:
+                return result
+        breaker = self.breaker(json_url)
+        for attempt in range(self.attempts):
+            if not breaker.allow():
+                break
+            try:
+                self.requests += 1
+                parser = PathExtractor(paths)
+                size = 0
+                async with self._lock:
+                    if self.wake:
+                        await self.wake()
+                    headers = self.http_cache.validators(json_url) if cached else None
+                    if headers:
+                        response = self._timed(self.wifi.get, json_url, headers=headers)
+                    else:
+                        response = self._timed(self.wifi.get, json_url)
+                    if self.on_headers:
+                        self.on_headers(response.headers)
+                    if headers and response.status_code == 304:
+                        response.close()  # no body: the socket can be reused
+                        self._succeeded(breaker)
+                        return self.http_cache.revalidated(json_url, response.headers)
+                    if response.status_code != 200:
+                        self._rejected(breaker, response)
+                    while True:
+                        count = self._read(response)
+                        if not count:
+                            break
+                        size += count
+                        with self._parse:
+                            parser.feed(self._buffer, count)
+                        await asyncio.sleep(0)
+                result = parser.finish()
+                self._succeeded(breaker)
+                if cached:
+                    self.http_cache.store(json_url, response.headers, result, size)
+                return result
+            except StatusError as e:
+                print(f"attempt {attempt} for {error_msg}: {e}")
+            except (OSError,
+                    RuntimeError,
+                    ValueError,
+                    adafruit_requests.OutOfRetries) as e:
+                print(f"attempt {attempt} for {error_msg}: {e}")
+                self._failed(breaker)
+            if attempt < self.attempts - 1:
+                await asyncio.sleep(self.retry_delay * (1 << attempt) *
+                                    (0.8 + 0.4 * random.random()))
+        return None
+
+    async def download(self, url: str, path: str, error_msg: str):
+        """ stream the body at url into the file at path, chunk by chunk
+
+        One attempt and no reload: a missing image is not worth either.
+        Returns the number of bytes written, or None on failure.
+        """
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            return None
+        # the file first: a read-only or full drive is not a network failure
+        try:
+            f = open(path, "wb")
+        except OSError as e:
+            print(f"{error_msg}: {path}: {e}")
+            return None
+        self.requests += 1
+        try:
+            with f:
+                async with self._lock:
+                    if self.wake:
+                        await self.wake()
+                    response = self._timed(self.wifi.get, url)
+                    if self.on_headers:
+                        self.on_headers(response.headers)
+                    if response.status_code != 200:
+                        self._rejected(breaker, response)
+                    size = 0
+                    while True:
+                        count = self._read(response)
+                        if not count:
+                            break
+                        try:
+                            f.write(self._view[:count])
+                        except OSError as e:
+                            print(f"{error_msg}: {path}: {e}")
+                            response.close()  # reads off the rest: the socket stays usable
+                            return None
+                        size += count
+                        await asyncio.sleep(0)
+            self._succeeded(breaker)
+            return size
+        except StatusError as e:
+            print(f"{error_msg}: {e}")
+            return None
+        except (OSError,
+                RuntimeError,
+                ValueError,
+                adafruit_requests.OutOfRetries) as e:
+            print(f"{error_msg}: {e}")
+            # a missing image is no reason to reset the ESP32
+            self._failed(breaker, escalate=False)
+            return None
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return (f"fetch: {self.requests} requests {self.failures} failures "
+                f"{self.esp_resets} ESP32 resets "
+                f"max block {self.max_block_ms} ms")
+
+    def health(self) -> str:
+        """ each endpoint's breaker, for the serial console """
+        return "health: " + "; ".join(breaker.stats() for breaker in self.breakers.values())
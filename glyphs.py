@@ -0,0 +1,156 @@
+# Batch glyph loading with a compact on-flash glyph cache
+#
+# SPDX-License-Identifier: MIT
+import os
+import struct
+
+import displayio
+from fontio import Glyph
+
+try:
+    import bitmaptools
+except ImportError:
+    bitmaptools = None
+
+_MAGIC = b"GLY1"
+# code point, width, height, dx, dy, shift_x, shift_y; width 0xFF marks a
+# code point the font does not have
+_RECORD = "<IBBbbbb"
+_RECORD_SIZE = struct.calcsize(_RECORD)
+_MISSING = 0xFF
+
+# Close-enough ASCII for punctuation that the BDF fonts often lack
+FALLBACKS = {
+    0x2018: "'", 0x2019: "'", 0x201C: '"', 0x201D: '"',
+    0x2013: "-", 0x2014: "-", 0x2026: "...", 0x00A0: " ",
+}
+
+
+def _pack(bitmap, width, height) -> bytes:
+    """ 1 bit per pixel, rows padded to a byte, first pixel in the MSB """
+    row_bytes = (width + 7) // 8
+    data = bytearray(row_bytes * height)
+    for y in range(height):
+        for x in range(width):
+            if bitmap[x, y]:
+                data[y * row_bytes + x // 8] |= 0x80 >> (x % 8)
+    return data
+
+
+def _unpack(f, bitmap, width, height):
+    if bitmaptools:
+        bitmaptools.readinto(bitmap, f, 1, 1, True)
+        return
+    row_bytes = (width + 7) // 8
+    data = f.read(row_bytes * height)
+    for y in range(height):
+        for x in range(width):
+            if data[y * row_bytes + x // 8] & (0x80 >> (x % 8)):
+                bitmap[x, y] = 1
+
+
+class GlyphManager:
+    """ load the glyphs a payload needs in one pass, and remember them
+
+    ``Label`` loads missing glyphs one character at a time, and each miss
+    rescans the whole BDF file while the label is being set.  ``prepare()``
+    collects every character a text needs and loads the missing ones in a
+    single scan.  Parsed glyphs, and the code points a font lacks, are
+    appended to a small binary file per font so later boots skip the BDF
+    parsing.  Writing needs the CIRCUITPY drive to be writable (a
+    ``storage.remount("/", False)`` in boot.py); without that the cache
+    still works in RAM.
+
+        :param cache_dir: directory holding the ``<name>.gly`` files
+    """
+
+    def __init__(self, cache_dir="/glyphs"):
+        self.cache_dir = cache_dir
+        self.writable = True
+        self.batches = 0
+        self.loaded = 0  # glyphs parsed from BDF files
+        self.restored = 0  # glyphs read back from the cache
+        self._names = {}
+
+    def _path(self, font):
+        return self.cache_dir + "/" + self._names[id(font)] + ".gly"
+
+    def add_font(self, font, name):
+        """ register font and read back its cached glyphs """
+        self._names[id(font)] = name
+        try:
+            with open(self._path(font), "rb") as f:
+                if f.read(4) != _MAGIC:
+                    return
+                self._restore(font, f)
+        except OSError:
+            pass  # nothing cached yet
+
+    def _restore(self, font, f):
+        bitmap_class = getattr(font, "bitmap_class", displayio.Bitmap)
+        while True:
+            record = f.read(_RECORD_SIZE)
+            if len(record) < _RECORD_SIZE:
+                return
+            code, width, height, dx, dy, shift_x, shift_y = struct.unpack(_RECORD, record)
+            if width == _MISSING:
+                font._glyphs[code] = None
+                continue
+            bitmap = bitmap_class(width, height, 2)
+            _unpack(f, bitmap, width, height)
+            font._glyphs[code] = Glyph(bitmap, 0, width, height, dx, dy, shift_x, shift_y)
+            self.restored += 1
+
+    def _save(self, font, code_points):
+        if not self.writable:
+            return
+        try:
+            try:
+                os.stat(self.cache_dir)
+            except OSError:
+                os.mkdir(self.cache_dir)
+            path = self._path(font)
+            try:
+                new_file = os.stat(path)[6] == 0
+            except OSError:
+                new_file = True
+            with open(path, "ab") as f:
+                if new_file:
+                    f.write(_MAGIC)
+                for code in code_points:
+                    glyph = font._glyphs.get(code)
+                    if glyph is None:
+                        f.write(struct.pack(_RECORD, code, _MISSING, 0, 0, 0, 0, 0))
+                        continue
+                    f.write(struct.pack(_RECORD, code, glyph.width, glyph.height, glyph.dx,
+                                        glyph.dy, glyph.shift_x, glyph.shift_y))
+                    f.write(_pack(glyph.bitmap, glyph.width, glyph.height))
+        except OSError as e:
+            # read-only filesystem: keep going without persistence
+            print(f"glyph cache disabled: {e}")
+            self.writable = False
+
+    def prepare(self, text, *fonts) -> str:
+        """ load every glyph text needs for each font, return printable text
+
+        Characters none of the fonts have are swapped for ``FALLBACKS``
+        where there is one.
+        """
+        needed = set(ord(c) for c in text)
+        for font in fonts:
+            missing = set(code for code in needed if code not in font._glyphs)
+            if missing:
+                self.batches += 1
+                font.load_glyphs(set(missing))  # the BDF loader empties the set it is given
+                self.loaded += len(missing)
+                if id(font) in self._names:
+                    self._save(font, missing)
+        for code in needed:
+            if code in FALLBACKS and all(font._glyphs.get(code) is None for font in fonts):
+                text = text.replace(chr(code), FALLBACKS[code])
+        return text
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return (f"glyphs: {self.batches} batches {self.loaded} parsed "
+                f"{self.restored} from cache")
@@ -0,0 +1,84 @@
+# Frame pacing for the input/render loop
+#
+# SPDX-License-Identifier: MIT
+import time
+
+import asyncio
+
+
+class FrameGovernor:
+    """ run a loop at a target frame rate, faster for a while after input
+
+    ``await frame()`` at the end of each pass sleeps for whatever is left of
+    the frame period, so a loop costs its own work plus nothing.  While
+    idle the loop runs at ``fps``; ``boost()`` (called on a touch) switches
+    to ``active_fps`` for ``boost_seconds`` so follow-up taps and holds are
+    sampled quickly.  ``stats()`` reports the frame rate achieved, the
+    share of time the loop spent asleep and the share lost to waking late
+    (other tasks holding the CPU past the requested sleep) since the
+    previous report.
+
+        :param fps: frames per second while idle
+        :param active_fps: frames per second after input
+        :param boost_seconds: how long input keeps the faster rate
+    """
+
+    def __init__(self, fps=10, active_fps=50, boost_seconds=3):
+        self.fps = fps
+        self.active_fps = active_fps
+        self.boost_seconds = boost_seconds
+        self.frames = 0
+        self.max_gap_ms = 0  # longest frame, including time other tasks held the CPU
+        self._boost_until = 0
+        self._frame_start = time.monotonic_ns()
+        self._window_start = self._frame_start
+        self._window_frames = 0
+        self._window_asleep = 0
+        self._window_late = 0
+
+    def boost(self):
+        """ use the active frame rate for the next boost_seconds """
+        self._boost_until = time.monotonic_ns() + int(self.boost_seconds * 1000000000)
+
+    def resume(self):
+        """ start a new frame now, after the loop was parked elsewhere """
+        self._frame_start = time.monotonic_ns()
+
+    @property
+    def period(self) -> float:
+        """ current frame period in seconds """
+        if time.monotonic_ns() < self._boost_until:
+            return 1 / self.active_fps
+        return 1 / self.fps
+
+    async def frame(self):
+        """ end the current frame: sleep out the rest of its period """
+        now = time.monotonic_ns()
+        work = now - self._frame_start
+        sleep = max(self.period - work / 1000000000, 0)
+        await asyncio.sleep(sleep)
+        woke = time.monotonic_ns()
+        # past the requested sleep the loop was not idle but kept waiting
+        requested = int(sleep * 1000000000)
+        slept = woke - now
+        self._window_asleep += min(slept, requested)
+        if slept > requested:
+            self._window_late += slept - requested
+        self.max_gap_ms = max(self.max_gap_ms, (woke - self._frame_start) // 1000000)
+        self.frames += 1
+        self._window_frames += 1
+        self._frame_start = woke
+
+    def stats(self) -> str:
+        """ one line summary for the serial console; starts a new window """
+        now = time.monotonic_ns()
+        elapsed = max(now - self._window_start, 1)
+        fps = self._window_frames * 1000000000 / elapsed
+        idle = 100 * self._window_asleep / elapsed
+        late = 100 * self._window_late / elapsed
+        self._window_start = now
+        self._window_frames = 0
+        self._window_asleep = 0
+        self._window_late = 0
+        return (f"frames: {fps:.1f} fps {idle:.0f}% idle {late:.0f}% late "
+                f"max frame {self.max_gap_ms} ms")
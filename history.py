@@ -0,0 +1,105 @@
+# Recently played tracks, merged from every Radio Paradise list
+#
+# SPDX-License-Identifier: MIT
+from rp import song_key
+
+
+class Track:
+    """ one played track; slots keep each record to a few words """
+
+    __slots__ = ("key", "title", "artist", "album", "start")
+
+    def __init__(self, key, title, artist, album, start):
+        self.key = key
+        self.title = title
+        self.artist = artist
+        self.album = album
+        self.start = start  # UTC epoch seconds, or None
+
+
+class History:
+    """ the last ``size`` tracks, oldest overwritten first
+
+    ``nowplaying_list_v2022`` returns the current song and the ones before
+    it, so consecutive lists overlap.  ``merge()`` adds only the songs not
+    already held, in the order they played, into a fixed ring of slots.
+    Artist and album names repeat a lot across an hour of a channel, so
+    they are interned: equal strings share one object.  After a reload one
+    list fills in the last few tracks straight away.
+
+        :param size: tracks kept
+    """
+
+    def __init__(self, size=12):
+        self.size = size
+        self.added = 0
+        self.duplicates = 0
+        self._slots = [None] * size
+        self._next = 0  # slot the next track goes into
+        self._strings = {}
+
+    def _intern(self, text):
+        if text is None:
+            return None
+        return self._strings.setdefault(text, text)
+
+    def _prune(self):
+        """ drop interned strings no held track uses any more """
+        used = {}
+        for track in self._slots:
+            if track is not None:
+                used[track.artist] = track.artist
+                used[track.album] = track.album
+        self._strings = used
+
+    def __contains__(self, key):
+        for track in self._slots:
+            if track is not None and track.key == key:
+                return True
+        return False
+
+    def __len__(self):
+        return sum(1 for track in self._slots if track is not None)
+
+    def merge(self, songs) -> int:
+        """ add songs (newest first, as the API lists them) that are new;
+        returns how many were added """
+        added = 0
+        for song in reversed(songs):
+            key = song_key(song)
+            if key is None:
+                continue
+            if key in self:
+                self.duplicates += 1
+                continue
+            start = song.get("sched_time_millis")
+            self._slots[self._next] = Track(
+                key, song.get("title"), self._intern(song.get("artist")),
+                self._intern(song.get("album")),
+                int(start) // 1000 if start is not None else None)
+            self._next = (self._next + 1) % self.size
+            added += 1
+        if added:
+            self.added += added
+            if len(self._strings) > 2 * self.size:
+                self._prune()
+        return added
+
+    def recent(self, count=None):
+        """ the held tracks, newest first """
+        tracks = []
+        i = self._next
+        for _ in range(self.size):
+            i = (i - 1) % self.size
+            track = self._slots[i]
+            if track is None:
+                break
+            tracks.append(track)
+            if count is not None and len(tracks) == count:
+                break
+        return tracks
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return (f"history: {len(self)} tracks {self.added} added "
+                f"{self.duplicates} duplicates {len(self._strings)} strings")
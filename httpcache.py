@@ -0,0 +1,110 @@
+# HTTP freshness and validators, so unchanged documents are not downloaded again
+#
+# SPDX-License-Identifier: MIT
+import time
+
+from clock import parse_http_date
+
+
+def freshness(headers):
+    """ seconds the response stays fresh per its Cache-Control or Expires
+    header; 0 when it must be revalidated, None when it must not be kept """
+    control = headers.get("cache-control", "").lower()
+    if "no-store" in control:
+        return None
+    if "no-cache" in control:
+        return 0
+    lifetime = None
+    for directive in control.split(","):
+        name, _, value = directive.strip().partition("=")
+        if name == "max-age":
+            try:
+                lifetime = int(value.strip('"'))
+            except ValueError:
+                lifetime = 0
+            break
+    if lifetime is None:
+        expires = parse_http_date(headers.get("expires"))
+        date = parse_http_date(headers.get("date"))
+        lifetime = expires - date if expires is not None and date is not None else 0
+    try:
+        lifetime -= int(headers.get("age", 0))
+    except ValueError:
+        pass
+    return max(lifetime, 0)
+
+
+class HttpCache:
+    """ the last result per URL with its lifetime and validators
+
+    While an entry is fresh (``Cache-Control: max-age`` or ``Expires``) the
+    request is skipped altogether.  Once stale, ``validators()`` gives the
+    ``If-None-Match``/``If-Modified-Since`` headers, and a 304 answer means
+    the stored result still holds.  What is stored is the caller's parsed
+    result, not the body, so an entry costs a few dozen bytes.
+    ``avoided_requests`` and ``avoided_bytes`` count what fresh hits and
+    304s saved, using the size of the last full body.
+    """
+
+    def __init__(self):
+        self.fresh_hits = 0
+        self.not_modified = 0
+        self.avoided_requests = 0
+        self.avoided_bytes = 0
+        self._entries = {}  # url -> [expires (monotonic), etag, last-modified, result, size]
+
+    def fresh(self, url):
+        """ the stored result for url if it is still fresh, else None """
+        entry = self._entries.get(url)
+        if entry is None or time.monotonic() >= entry[0]:
+            return None
+        self.fresh_hits += 1
+        self.avoided_requests += 1
+        self.avoided_bytes += entry[4]
+        return entry[3]
+
+    def expires_in(self, url):
+        """ seconds until url's stored result goes stale (0 once it has),
+        or None when nothing is stored """
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        return max(entry[0] - time.monotonic(), 0)
+
+    def validators(self, url):
+        """ conditional request headers for url, or None """
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        headers = {}
+        if entry[1]:
+            headers["If-None-Match"] = entry[1]
+        if entry[2]:
+            headers["If-Modified-Since"] = entry[2]
+        return headers or None
+
+    def revalidated(self, url, headers):
+        """ a 304 for url: its stored result, with a renewed lifetime """
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        lifetime = freshness(headers)
+        entry[0] = time.monotonic() + (lifetime or 0)
+        self.not_modified += 1
+        self.avoided_bytes += entry[4]
+        return entry[3]
+
+    def store(self, url, headers, result, size):
+        """ keep result (parsed from a size byte body) as headers allow """
+        lifetime = freshness(headers)
+        etag = headers.get("etag")
+        modified = headers.get("last-modified")
+        if lifetime is None or (not lifetime and not etag and not modified):
+            self._entries.pop(url, None)  # nothing to gain from keeping it
+            return
+        self._entries[url] = [time.monotonic() + lifetime, etag, modified, result, size]
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return (f"http cache: {self.fresh_hits} fresh {self.not_modified} not modified "
+                f"{self.avoided_requests} requests {self.avoided_bytes // 1024} KB avoided")
@@ -0,0 +1,299 @@
+# LAN hub: polls the upstream APIs once and serves compact records to every display
+#
+# SPDX-License-Identifier: MIT
+import json
+import time
+import asyncio
+from datetime import datetime
+from email.utils import formatdate
+from http import HTTPStatus
+from http.client import HTTPException
+
+from breaker import CircuitBreaker
+from channels import HISTORY_FIELDS, SONG_FIELDS, Channel
+from httpcache import freshness
+from weather import HUB_TEMPERATURE
+
+WEATHER_MIN = 60  # least seconds between weather polls, whatever the headers say
+WEATHER_MAX = 1800  # most seconds between weather polls
+POLL_ERROR_DELAY = 30  # seconds a poller rests after an unexpected error
+LONG_POLL = 25  # longest a request with ?wait= is held open
+COVER_MAX_AGE = 86400  # covers never change under the same path
+
+
+class Topic:
+    """ the current record of one endpoint and an ETag that changes with it
+
+    ``publish`` stores a record as compact JSON; an unchanged record keeps
+    its ETag, so a display asking with ``If-None-Match`` gets a 304.
+    ``wait`` is the long poll: it returns as soon as the record is no
+    longer the one the client has, or after the timeout.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.body = None
+        self.etag = None
+        self.expires = 0.0  # epoch seconds the record stays fresh until
+        self._changed = asyncio.Event()
+
+    def publish(self, record, max_age=0) -> bool:
+        """ make record current for max_age seconds; True if it changed """
+        self.expires = time.time() + max_age
+        body = json.dumps(record, separators=(",", ":")).encode()
+        if body == self.body:
+            return False
+        self.body = body
+        self.version += 1
+        self.etag = f'"{self.version}"'
+        self._changed.set()
+        self._changed = asyncio.Event()
+        return True
+
+    async def wait(self, etag, timeout):
+        """ until the record differs from etag, at most timeout seconds """
+        if etag != self.etag or timeout <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class Hub:
+    """ one poller of Radio Paradise, weather.gov and the covers for many displays
+
+    Each channel is polled just after its track ends (channels.Channel and
+    its MusicSchedule, as on the display) and the weather as its cache
+    headers allow, each upstream host behind a CircuitBreaker.  What the
+    displays get is only the fields they read: ``/music?chan=N`` is
+    ``{"song": [...]}`` with the RP field names, so the display's paths
+    work unchanged, in a few hundred bytes instead of ~9 KB;
+    ``/weather`` is ``{"temperature": celsius}``; ``/time`` is the host
+    clock in the time API's format; ``/cover/<path>`` serves RP covers
+    from memory.  Every answer has a Date header (the display sets its
+    clock from it), an ETag and Cache-Control, so repeats cost a 304.
+    ``?wait=seconds`` with ``If-None-Match`` holds a ``/music`` request
+    until the song changes, for clients that can keep a request open.
+    Upstream load is the same for one display or a hundred.
+
+        :param fetch: blocking function (url, headers) returning (status,
+                      lowercased headers, body); it runs on a worker thread
+        :param chans: RP channel numbers to follow
+        :param weather_url: the weather.gov observation to poll
+        :param cover_url: what the payload's cover paths are relative to
+        :param list_num: songs asked for in each RP list
+        :param covers: covers kept in memory
+    """
+
+    def __init__(self, fetch, chans, weather_url, cover_url, list_num=4, covers=32):
+        self.fetch = fetch
+        self.channels = [Channel(chan, list_num) for chan in chans]
+        self.weather_url = weather_url
+        self.cover_url = cover_url
+        self.max_covers = covers
+        self.music = {}  # chan -> Topic
+        self.weather = None
+        self.breakers = {}  # upstream host -> CircuitBreaker
+        self.upstream = 0
+        self.served = 0
+        self.not_modified = 0
+        self.clients = set()
+        self._covers = {}  # path -> JPEG bytes, oldest first
+        self._downloads = {}  # path -> upstream request in flight
+        self._weather_validators = {}
+
+    async def _get(self, url, headers=None):
+        """ (status, headers, body) from upstream, or None on failure or
+        while the host's breaker is open """
+        host = url.split("/", 3)[2]
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(host)
+            self.breakers[host] = breaker
+        if not breaker.allow():
+            return None
+        self.upstream += 1
+        try:
+            result = await asyncio.to_thread(self.fetch, url, headers or {})
+        except (OSError, HTTPException) as e:
+            print(f"upstream {host}: {e!r}")
+            breaker.failure()
+            return None
+        if result[0] >= 500:
+            breaker.failure()
+        else:
+            breaker.success()
+        return result
+
+    async def _poll(self, name, once):
+        """ call once() for ever, sleeping the seconds it returns; an
+        unexpected error is printed and the polling goes on, since a
+        poller that dies silently freezes every display """
+        while True:
+            try:
+                wait = await once()
+            except Exception as e:  # pylint: disable=broad-except
+                print(f"{name} poller: {e!r}")
+                wait = POLL_ERROR_DELAY
+            await asyncio.sleep(wait)
+
+    async def _poll_music(self, channel) -> float:
+        topic = self.music[channel.chan]
+        songs = None
+        result = await self._get(channel.url)
+        if result and result[0] == 200:
+            try:
+                songs = [{name: song.get(name) for name in
+                          (SONG_FIELDS if i == 0 else HISTORY_FIELDS)}
+                         for i, song in enumerate(json.loads(result[2])["song"])]
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                print(f"music {channel.chan}: {e}")
+        channel.polls += 1
+        if songs:
+            channel.schedule.update(songs[0], time.time())
+            if topic.publish({"song": songs}):
+                print(f"channel {channel.chan}: {songs[0]['title']} - {songs[0]['artist']}")
+        else:
+            channel.schedule.failed()
+        return channel.schedule.delay(time.time())
+
+    async def _poll_weather(self) -> float:
+        topic = self.weather
+        result = await self._get(self.weather_url, self._weather_validators)
+        if not result or result[0] not in (200, 304):
+            return WEATHER_MIN
+        status, headers, body = result
+        lifetime = freshness(headers) or 0
+        try:
+            if status == 200:
+                value = json.loads(body)["properties"]["temperature"]["value"]
+                topic.publish({HUB_TEMPERATURE: value}, lifetime)
+                self._weather_validators = {
+                    name: headers[key] for name, key in
+                    (("If-None-Match", "etag"), ("If-Modified-Since", "last-modified"))
+                    if key in headers}
+            else:
+                topic.expires = time.time() + lifetime
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"weather: {e}")
+            return WEATHER_MIN
+        return min(max(lifetime, WEATHER_MIN), WEATHER_MAX)
+
+    async def _cover(self, path):
+        body = self._covers.pop(path, None)
+        if body is None:
+            # every display asks for a new track's cover at once: one download
+            pending = self._downloads.get(path)
+            if pending is None:
+                pending = asyncio.ensure_future(self._get(self.cover_url + path))
+                self._downloads[path] = pending
+            try:
+                result = await asyncio.shield(pending)
+            finally:
+                if self._downloads.get(path) is pending and pending.done():
+                    del self._downloads[path]
+            if not result or result[0] != 200:
+                return 502, (), b"no cover"
+            body = result[2]
+            while len(self._covers) >= self.max_covers:
+                del self._covers[next(iter(self._covers))]
+        self._covers[path] = body  # newest last
+        return 200, (("Content-Type", "image/jpeg"),
+                     ("Cache-Control", f"max-age={COVER_MAX_AGE}")), body
+
+    def _record(self, topic, request_headers):
+        if topic.body is None:
+            return 503, (), b"not polled yet"
+        left = int(topic.expires - time.time())
+        headers = (("Content-Type", "application/json"), ("ETag", topic.etag),
+                   ("Cache-Control", f"max-age={left}" if left > 0 else "no-cache"))
+        if request_headers.get("if-none-match") == topic.etag:
+            self.not_modified += 1
+            return 304, headers, b""
+        return 200, headers, topic.body
+
+    async def _route(self, target, request_headers):
+        path, _, query = target.partition("?")
+        params = dict(part.partition("=")[::2] for part in query.split("&") if part)
+        if path == "/music":
+            topic = self.music.get(int(params.get("chan", 0)))
+            if topic is None:
+                return 404, (), b"channel not followed"
+            wait = min(float(params.get("wait", 0)), LONG_POLL)
+            await topic.wait(request_headers.get("if-none-match"), wait)
+            return self._record(topic, request_headers)
+        if path == "/weather":
+            return self._record(self.weather, request_headers)
+        if path == "/time":
+            now = datetime.now().astimezone()
+            offset = now.strftime("%z")
+            record = {"datetime": now.isoformat(timespec="microseconds"),
+                      "utc_offset": f"{offset[:3]}:{offset[3:]}"}
+            return 200, (("Content-Type", "application/json"), ("Cache-Control", "no-cache")), \
+                json.dumps(record, separators=(",", ":")).encode()
+        if path.startswith("/cover/"):
+            return await self._cover(path[len("/cover/"):])
+        if path == "/stats":
+            return 200, (("Content-Type", "text/plain"),), self.stats().encode()
+        return 404, (), b"not found"
+
+    async def _serve(self, reader, writer):
+        """ answer one display's requests, kept alive until it hangs up """
+        self.clients.add(writer.get_extra_info("peername")[0])
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                _, target, _ = line.decode("latin-1").split(" ", 2)
+                request_headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    request_headers[name.strip().lower()] = value.strip()
+                try:
+                    status, headers, body = await self._route(target, request_headers)
+                except ValueError:
+                    status, headers, body = 400, (), b"bad request"
+                self.served += 1
+                head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                        f"Date: {formatdate(usegmt=True)}",
+                        f"Content-Length: {len(body)}"]
+                head.extend(f"{name}: {value}" for name, value in headers)
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+                await writer.drain()
+                if request_headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _report(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            print(self.stats())
+
+    async def run(self, host="0.0.0.0", port=8081, report=60):
+        """ poll the upstreams and serve the displays until cancelled """
+        self.music = {channel.chan: Topic() for channel in self.channels}
+        self.weather = Topic()
+        server = await asyncio.start_server(self._serve, host, port)
+        print(f"hub on {host}:{port} for channels "
+              + ",".join(str(channel.chan) for channel in self.channels))
+        async with server:
+            await asyncio.gather(server.serve_forever(),
+                                 self._poll("weather", self._poll_weather),
+                                 *(self._poll(f"music {channel.chan}",
+                                              lambda channel=channel: self._poll_music(channel))
+                                   for channel in self.channels),
+                                 self._report(report))
+
+    def stats(self) -> str:
+        """ one line summary for the console """
+        return (f"hub: {len(self.clients)} displays {self.served} served "
+                f"{self.not_modified} not modified {self.upstream} upstream requests "
+                f"{len(self._covers)} covers held")
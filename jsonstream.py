@@ -0,0 +1,234 @@
+# Streaming, path-selecting JSON extraction
+#
+# SPDX-License-Identifier: MIT
+import json
+
+# parser states
+_VALUE = 0  # expecting a value
+_SPAN = 1  # inside a value that is being skipped or captured
+_AFTER = 2  # expecting "," or the end of the container
+_KEY = 3  # expecting a key (or "}" for an empty object)
+_KEYSTR = 4  # inside a key
+_COLON = 5  # expecting ":"
+
+_QUOTE = 0x22
+_BACKSLASH = 0x5C
+_COMMA = 0x2C
+_COLON_CHR = 0x3A
+_OPEN = (0x7B, 0x5B)  # { [
+_CLOSE = (0x7D, 0x5D)  # } ]
+_WS = (0x20, 0x09, 0x0D, 0x0A)
+_SCALAR_END = (0x2C, 0x7D, 0x5D, 0x20, 0x09, 0x0D, 0x0A)
+
+
+def _prefixes(path):
+    """ every container path leading to path, e.g. song, song[0] """
+    result = []
+    for i, c in enumerate(path):
+        if c in ".[":
+            result.append(path[:i])
+    return result
+
+
+class PathExtractor:
+    """ keep only the requested values of a JSON document fed in chunks
+
+    Paths use dots for object keys and ``[n]`` for array items, e.g.
+    ``song[0].title`` or ``properties.temperature.value``.  Anything not on
+    the way to a requested path is scanned past without being stored, so
+    peak memory is one chunk plus the selected values.  A requested path
+    that lies inside another requested value is not reported separately.
+
+        :param paths: the paths to extract
+    """
+
+    def __init__(self, paths):
+        self.wanted = set(paths)
+        self._containers = {""}
+        for path in self.wanted:
+            for prefix in _prefixes(path):
+                self._containers.add(prefix)
+        self.result = {}
+        self.done = False
+        self._state = _VALUE
+        self._path = ""  # path of the value being parsed
+        self._stack = []  # [path, index] per open container, index None for objects
+        self._key = bytearray()
+        self._capture = None  # bytearray while copying a wanted value
+        self._depth = 0  # container nesting inside the current span
+        self._in_str = False
+        self._escape = False
+        self._scalar = False
+
+    @property
+    def complete(self) -> bool:
+        """ True once every requested path has been found """
+        return len(self.result) == len(self.wanted)
+
+    def _child(self, name):
+        parent = self._stack[-1][0]
+        if isinstance(name, int):
+            return parent + "[" + str(name) + "]"
+        if parent:
+            return parent + "." + name
+        return name
+
+    def _start_value(self, c):
+        path = self._path
+        if path in self.wanted:
+            self._capture = bytearray()
+        elif c in _OPEN and path in self._containers:
+            if c == 0x7B:
+                self._stack.append([path, None])
+                self._state = _KEY
+            else:
+                self._stack.append([path, 0])
+                self._path = path + "[0]"
+                self._state = _VALUE
+            return
+        self._state = _SPAN
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+        self._scalar = False
+        if c in _OPEN:
+            self._depth = 1
+        elif c == _QUOTE:
+            self._in_str = True
+        else:
+            self._scalar = True
+        if self._capture is not None:
+            self._capture.append(c)
+
+    def _end_value(self):
+        if self._capture is not None:
+            self.result[self._path] = json.loads(self._capture)
+            self._capture = None
+        self._state = _AFTER
+        if not self._stack:
+            self.done = True
+
+    def _close(self):
+        self._stack.pop()
+        self._state = _AFTER
+        if not self._stack:
+            self.done = True
+
+    def feed(self, chunk, length=None):
+        """ parse the next chunk of the document; with length, only its
+        first length bytes (chunk can then be a reused buffer) """
+        i = 0
+        n = len(chunk) if length is None else length
+        while i < n and not self.done:
+            c = chunk[i]
+            state = self._state
+            if state == _SPAN:
+                capture = self._capture
+                if self._scalar:
+                    if c in _SCALAR_END:
+                        self._end_value()
+                        continue  # the delimiter belongs to the container
+                elif self._in_str:
+                    if self._escape:
+                        self._escape = False
+                    elif c == _BACKSLASH:
+                        self._escape = True
+                    elif c == _QUOTE:
+                        self._in_str = False
+                        if self._depth == 0:
+                            if capture is not None:
+                                capture.append(c)
+                            self._end_value()
+                            i += 1
+                            continue
+                    elif capture is None:
+                        # skip ahead to the next quote or escape; an index scan,
+                        # as bytearray (the reused read buffer) has no find()
+                        # on CircuitPython
+                        i += 1
+                        while i < n:
+                            c = chunk[i]
+                            if c == _QUOTE or c == _BACKSLASH:
+                                break
+                            i += 1
+                        continue
+                elif c == _QUOTE:
+                    self._in_str = True
+                elif c in _OPEN:
+                    self._depth += 1
+                elif c in _CLOSE:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        if capture is not None:
+                            capture.append(c)
+                        self._end_value()
+                        i += 1
+                        continue
+                if capture is not None:
+                    capture.append(c)
+            elif state == _KEYSTR:
+                if self._escape:
+                    self._escape = False
+                elif c == _BACKSLASH:
+                    self._escape = True
+                elif c == _QUOTE:
+                    self._state = _COLON
+                    i += 1
+                    continue
+                self._key.append(c)
+            elif c in _WS:
+                pass
+            elif state == _VALUE:
+                if c == 0x5D and self._stack and self._stack[-1][1] is not None:
+                    self._close()  # empty array
+                else:
+                    self._start_value(c)
+            elif state == _AFTER:
+                if c == _COMMA:
+                    top = self._stack[-1]
+                    if top[1] is None:
+                        self._state = _KEY
+                    else:
+                        top[1] += 1
+                        self._path = self._child(top[1])
+                        self._state = _VALUE
+                elif c in _CLOSE:
+                    self._close()
+                else:
+                    raise ValueError("expected , or end of container")
+            elif state == _KEY:
+                if c == _QUOTE:
+                    self._key = bytearray()
+                    self._escape = False
+                    self._state = _KEYSTR
+                elif c == 0x7D:
+                    self._close()  # empty object
+                else:
+                    raise ValueError("expected key")
+            elif state == _COLON:
+                if c != _COLON_CHR:
+                    raise ValueError("expected :")
+                key = self._key
+                if b"\\" in key:
+                    key = b'"' + key + b'"'
+                    self._path = self._child(json.loads(key))
+                else:
+                    self._path = self._child(str(key, "utf-8"))
+                self._state = _VALUE
+            i += 1
+        return self.done
+
+    def finish(self) -> dict:
+        """ end of input; a pending top-level scalar is completed """
+        if self._state == _SPAN and self._scalar:
+            self._end_value()
+        return self.result
+
+
+def extract(chunks, paths) -> dict:
+    """ extract paths from an iterable of byte chunks """
+    parser = PathExtractor(paths)
+    for chunk in chunks:
+        if parser.feed(chunk):
+            break
+    return parser.finish()
@@ -0,0 +1,104 @@
+# Text measurement and truncation without throwaway Labels
+#
+# SPDX-License-Identifier: MIT
+
+ELLIPSIS = "..."
+_ASCII = "".join(chr(code) for code in range(32, 127))
+
+
+class TextLayout:
+    """ measure and truncate text in pixels using per-font advance tables
+
+    Each font gets an advance table built once: a bytearray for printable
+    ASCII plus a dict for anything else, filled from the font's glyphs.
+    The ASCII glyphs are loaded in one pass first (through the
+    GlyphManager when there is one, so its glyph cache files are used),
+    rather than a BDF scan for each glyph the font has not loaded yet.
+    Truncated lines are cached by (font, text, width) so the same track is
+    never measured twice when the Recent list is redrawn.
+
+        :param cache_size: lines kept before the oldest is dropped
+        :param glyphs: the GlyphManager to load glyphs through, or None
+    """
+
+    def __init__(self, cache_size=24, glyphs=None):
+        self.cache_size = cache_size
+        self.glyphs = glyphs
+        self.hits = 0
+        self.misses = 0
+        self._ascii = {}  # id(font) -> bytearray of advances for 32..126
+        self._other = {}  # id(font) -> {code point: advance}
+        self._cache = {}
+        self._order = []
+
+    def _table(self, font):
+        table = self._ascii.get(id(font))
+        if table is None:
+            if not hasattr(font, "load_glyphs"):
+                pass  # a built-in font: every glyph is there already
+            elif self.glyphs is not None:
+                self.glyphs.prepare(_ASCII, font)
+            else:
+                font.load_glyphs(_ASCII)
+            table = bytearray(95)
+            for code in range(32, 127):
+                glyph = font.get_glyph(code)
+                if glyph:
+                    table[code - 32] = glyph.shift_x
+            self._ascii[id(font)] = table
+            self._other[id(font)] = {}
+        return table
+
+    def advance(self, font, char) -> int:
+        """ pixels the cursor moves for char """
+        code = ord(char)
+        table = self._table(font)
+        if 32 <= code < 127:
+            return table[code - 32]
+        other = self._other[id(font)]
+        if code not in other:
+            glyph = font.get_glyph(code)
+            other[code] = glyph.shift_x if glyph else 0
+        return other[code]
+
+    def width(self, font, text) -> int:
+        """ width of a single line of text in pixels """
+        table = self._table(font)
+        total = 0
+        for char in text:
+            code = ord(char)
+            if 32 <= code < 127:
+                total += table[code - 32]
+            else:
+                total += self.advance(font, char)
+        return total
+
+    def _truncate(self, font, text, width):
+        if self.width(font, text) <= width:
+            return text
+        room = width - self.width(font, ELLIPSIS)
+        used = 0
+        for i, char in enumerate(text):
+            used += self.advance(font, char)
+            if used > room:
+                return text[:i].rstrip() + ELLIPSIS
+        return text
+
+    def truncate(self, font, text, width) -> str:
+        """ text cut to width, ending in an ellipsis if anything was cut """
+        key = (id(font), text, width)
+        result = self._cache.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = self._truncate(font, text, width)
+        self._cache[key] = result
+        self._order.append(key)
+        if len(self._order) > self.cache_size:
+            del self._cache[self._order.pop(0)]
+        return result
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return f"layout: {self.hits} hits {self.misses} misses"
@@ -0,0 +1,168 @@
+# A line of text rendered once and scrolled through a TileGrid viewport
+#
+# SPDX-License-Identifier: MIT
+import time
+
+import displayio
+
+try:
+    import bitmaptools
+except ImportError:
+    bitmaptools = None
+
+
+class Marquee:
+    """ one line of text that scrolls when it is wider than its viewport
+
+    ``set_text`` draws the whole line once into a 1 bit bitmap.  The
+    TileGrid shows it through tiles ``tile`` pixels wide, one more than
+    the viewport needs: scrolling by a pixel only moves the grid left,
+    and only when a whole tile has gone by are the tile indices shifted,
+    so a frame never redraws the text and costs a few attribute writes.
+    The line pauses ``pause`` seconds at each end and scrolls back and
+    forth at ``speed`` pixels a second.  The grid overhangs the viewport
+    by up to a tile on either side, so the viewport should run to the
+    screen edges, which clip it.  ``frames``/``max_us`` measure ``step``.
+
+        :param font: the font to draw with
+        :param width: viewport width in pixels
+        :param color: text color
+        :param tile: tile width in pixels
+        :param speed: scroll speed in pixels per second
+        :param pause: seconds held at each end
+        :param phase: a perf Phase to record each frame in, or None
+    """
+
+    def __init__(self, font, width, color=0xFFFFFF, tile=8, speed=30, pause=2.0,
+                 phase=None):
+        self.font = font
+        self.width = width
+        self.tile = tile
+        self.speed = speed
+        self.pause = pause
+        self.phase = phase
+        self.text = None
+        self.overflow = 0  # pixels the text is wider than the viewport
+        self.frames = 0
+        self.renders = 0
+        self.max_us = 0
+        self.group = displayio.Group()
+        self._palette = displayio.Palette(2)
+        self._palette[0] = 0x000000
+        self._palette[1] = color
+        self._palette.make_transparent(0)
+        box = font.get_bounding_box()
+        self.height = box[1]
+        self._baseline = box[1] + box[3]  # the bounding box's y offset is the descent
+        self._columns = width // tile + 2  # tiles in the grid
+        self._grid = None
+        self._blank = 0  # index of an empty tile
+        self._first = 0  # bitmap tile shown in the grid's first column
+        self._start = 0.0
+
+    @property
+    def scrolling(self) -> bool:
+        return self.overflow > 0
+
+    def color(self, color):
+        self._palette[1] = color
+
+    def _blit(self, bitmap, glyph, x, y):
+        source = glyph.bitmap
+        left = glyph.tile_index * glyph.width  # built-in fonts share one bitmap
+        if bitmaptools:
+            bitmaptools.blit(bitmap, source, x, y, x1=left, y1=0,
+                             x2=left + glyph.width, y2=glyph.height, skip_source_index=0)
+            return
+        for row in range(glyph.height):
+            for column in range(glyph.width):
+                if source[left + column, row]:
+                    bitmap[x + column, y + row] = 1
+
+    def set_text(self, text) -> bool:
+        """ draw text into a new bitmap and start from its left end; False
+        if it is the text already shown """
+        if text == self.text:
+            return False
+        self.text = text
+        glyphs = []
+        text_width = 0
+        for char in text:
+            glyph = self.font.get_glyph(ord(char))
+            if glyph:
+                glyphs.append(glyph)
+                text_width += glyph.shift_x
+        self.overflow = max(text_width - self.width, 0)
+        # room for every tile the grid can show, plus a blank one
+        tiles = max((text_width + self.tile - 1) // self.tile, self._columns) + 1
+        bitmap = displayio.Bitmap(tiles * self.tile, self.height, 2)
+        x = 0
+        for glyph in glyphs:
+            y = self._baseline - glyph.height - glyph.dy
+            if glyph.width and 0 <= x + glyph.dx and 0 <= y and y + glyph.height <= self.height:
+                self._blit(bitmap, glyph, x + glyph.dx, y)
+            x += glyph.shift_x
+        if self._grid is not None:
+            self.group.remove(self._grid)
+        self._grid = displayio.TileGrid(bitmap, pixel_shader=self._palette,
+                                        width=self._columns, height=1,
+                                        tile_width=self.tile, tile_height=self.height)
+        self.group.append(self._grid)
+        self._blank = tiles - 1
+        self._first = -1
+        self._show(0)
+        self._start = time.monotonic()
+        self.renders += 1
+        return True
+
+    def _show(self, offset):
+        first = offset // self.tile
+        self._grid.x = -(offset % self.tile)
+        if first != self._first:
+            self._first = first
+            for column in range(self._columns):
+                self._grid[column] = min(first + column, self._blank)
+
+    def _offset(self, now) -> int:
+        """ scroll position at now: pause, forth, pause, back, and again """
+        travel = self.overflow / self.speed
+        t = (now - self._start) % (2 * (self.pause + travel))
+        if t < self.pause:
+            return 0
+        t -= self.pause
+        if t < travel:
+            return int(t * self.speed)
+        t -= travel
+        if t < self.pause:
+            return self.overflow
+        return self.overflow - int((t - self.pause) * self.speed)
+
+    def restart(self):
+        """ back to the left end, e.g. when the line comes into view """
+        self._start = time.monotonic()
+        if self._grid is not None:
+            self._show(0)
+
+    def step(self) -> bool:
+        """ move to where the line should be now; True if it moved """
+        if not self.overflow:
+            return False
+        start = time.monotonic_ns()
+        if self.phase is not None:
+            self.phase.start()
+        offset = self._offset(time.monotonic())
+        moved = offset != self._first * self.tile - self._grid.x
+        if moved:
+            self._show(offset)
+        if self.phase is not None:
+            self.phase.stop()
+        self.frames += 1
+        elapsed_us = (time.monotonic_ns() - start) // 1000
+        if elapsed_us > self.max_us:
+            self.max_us = elapsed_us
+        return moved
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return (f"marquee: {self.renders} renders {self.frames} frames "
+                f"max {self.max_us} us {'scrolling' if self.overflow else 'static'}")
@@ -0,0 +1,127 @@
+# Named-phase timing histograms and memory low-water marks
+#
+# SPDX-License-Identifier: MIT
+import gc
+import time
+from array import array
+
+BUCKETS = 20  # bucket i holds durations of 2**i up to 2**(i+1) microseconds
+
+
+def _mem_free():
+    # gc.mem_free() only exists on CircuitPython/MicroPython
+    try:
+        return gc.mem_free()
+    except AttributeError:
+        return None
+
+
+class Phase:
+    """ timing for one named phase; use ``with phase:`` or start()/stop()
+
+    The histogram is preallocated, so timing a phase does not grow the heap.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.histogram = array("L", [0] * BUCKETS)
+        self._start = 0
+        self.reset()
+
+    def reset(self):
+        """ forget the timings so far """
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+        self.mem_low = None
+        for i in range(BUCKETS):
+            self.histogram[i] = 0
+
+    def start(self):
+        self._start = time.monotonic_ns()
+
+    def stop(self):
+        elapsed_us = (time.monotonic_ns() - self._start) // 1000
+        self.count += 1
+        self.total_us += elapsed_us
+        if elapsed_us > self.max_us:
+            self.max_us = elapsed_us
+        bucket = 0
+        while elapsed_us >> (bucket + 1) and bucket < BUCKETS - 1:
+            bucket += 1
+        self.histogram[bucket] += 1
+        free = _mem_free()
+        if free is not None and (self.mem_low is None or free < self.mem_low):
+            self.mem_low = free
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def percentile(self, fraction) -> int:
+        """ upper bound in microseconds of the bucket holding that fraction """
+        wanted = self.count * fraction
+        seen = 0
+        for i, n in enumerate(self.histogram):
+            seen += n
+            if n and seen >= wanted:
+                return 1 << (i + 1)
+        return 0
+
+    def summary(self) -> str:
+        """ one line: counts, mean/p50/p90/max and the raw histogram """
+        mean_us = self.total_us // self.count if self.count else 0
+        last = BUCKETS - 1
+        while last >= 0 and not self.histogram[last]:
+            last -= 1
+        buckets = " ".join(str(n) for n in self.histogram[:last + 1])
+        mem = f" mem low {self.mem_low}" if self.mem_low is not None else ""
+        return (f"{self.name}: {self.count}x mean {mean_us} us p50 <{self.percentile(0.5)} us "
+                f"p90 <{self.percentile(0.9)} us max {self.max_us} us{mem} [{buckets}]")
+
+
+class Profiler:
+    """ collect phase timings from across the program
+
+    ``phase(name)`` returns the same Phase object every time, so hot code
+    can look it up once and then only pay for two ``monotonic_ns()`` calls
+    and a ``gc.mem_free()`` per use.  Durations land in power-of-two
+    microsecond buckets, and each phase keeps the lowest free memory seen
+    when it ended.  ``stats()`` prints every phase, one line each, in the
+    order they were first used.
+    """
+
+    def __init__(self):
+        self._phases = {}
+        self._order = []
+
+    def phase(self, name) -> Phase:
+        """ the Phase for name, created on first use """
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = Phase(name)
+            self._phases[name] = phase
+            self._order.append(phase)
+        return phase
+
+    def collect(self):
+        """ run ``gc.collect()`` as the "gc" phase """
+        with self.phase("gc"):
+            gc.collect()
+
+    def reset(self):
+        """ forget all timings; Phase objects already handed out stay valid """
+        for phase in self._order:
+            phase.reset()
+
+    def stats(self) -> str:
+        """ summary lines for the serial console """
+        free = _mem_free()
+        lines = [f"profile: {len(self._order)} phases"
+                 + (f" mem free {free}" if free is not None else "")]
+        lines.extend(phase.summary() for phase in self._order)
+        return "\n".join(lines)
@@ -0,0 +1,213 @@
+# Backlight from ambient light, display sleep and ESP32 radio duty cycling
+#
+# SPDX-License-Identifier: MIT
+import time
+import asyncio
+
+# Rough PyPortal power draw in watts, for the energy estimate only
+BASE_WATTS = 0.25  # SAMD51, display controller, sensors
+BACKLIGHT_WATTS = 0.35  # backlight at full brightness
+RADIO_WATTS = 0.30  # ESP32 associated to the access point
+RADIO_OFF_WATTS = 0.01  # ESP32 held in reset
+RADIO_BOOT = 0.75  # seconds the ESP32 takes to boot once out of reset, as in esp.reset()
+JOIN_TIMEOUT = 15  # seconds warm_up waits for the access point
+JOIN_POLL = 0.25  # seconds between association checks while joining
+
+
+def _encoded(value):
+    """ a setting as the bytes the ESP32 firmware takes, like connect_AP """
+    return bytes(value, "utf-8") if isinstance(value, str) else value
+
+
+class PowerManager:
+    """ spend power only where it shows
+
+    Backlight: the light sensor reading is smoothed (exponential moving
+    average) and mapped between ``dim`` and ``bright``; the backlight only
+    moves when the target differs by more than ``hysteresis``, so flicker
+    in the room does not make the screen pump.  After ``sleep_after``
+    seconds without a touch the backlight goes off, and the next touch
+    turns it back on.
+
+    Radio: between fetches the ESP32 is held in reset, which drops its
+    draw to almost nothing.  ``plan(seconds)`` is told when the next
+    scheduled fetch is due; the radio goes down when that is more than
+    ``radio_min_off`` seconds away (and nothing used it for
+    ``radio_idle`` seconds).  ``radio_warmup`` seconds before the fetch
+    ``plan`` returns True, and the caller awaits ``warm_up``: it sleeps
+    through the boot, starts the join and polls for the association, so
+    the loop keeps running while the ESP32 comes up.  A fetch nobody
+    planned (a tap on a tab) awaits ``warm_up`` too, through FetchEngine's
+    ``wake``.  ``radio_needed`` is the last resort for a request that
+    finds the radio down anyway: it blocks through ``esp.reset()``, and
+    ``blocking_wakes`` counts how often that happened.
+
+        :param set_backlight: function taking a brightness from 0 to 1
+        :param dim: brightness in the dark
+        :param bright: brightness in full light
+        :param dark: light reading at or below which ``dim`` is used
+        :param light: light reading at or above which ``bright`` is used
+        :param smoothing: weight of a new light reading in the average
+        :param hysteresis: least brightness change applied
+        :param sleep_after: seconds without a touch before the backlight goes off
+        :param radio_idle: seconds the radio must be unused before it goes down
+        :param radio_min_off: shortest gap before a fetch worth powering down for
+        :param radio_warmup: seconds before a planned fetch to bring the radio up
+    """
+
+    def __init__(self, set_backlight, dim=0.1, bright=0.8, dark=2000, light=40000,
+                 smoothing=0.1, hysteresis=0.05, sleep_after=300, radio_idle=5,
+                 radio_min_off=30, radio_warmup=8):
+        self.set_backlight = set_backlight
+        self.dim = dim
+        self.bright = bright
+        self.dark = dark
+        self.light = light
+        self.smoothing = smoothing
+        self.hysteresis = hysteresis
+        self.sleep_after = sleep_after
+        self.radio_idle = radio_idle
+        self.radio_min_off = radio_min_off
+        self.radio_warmup = radio_warmup
+        self.asleep = False
+        self.brightness = None
+        self.wakes = 0
+        self.radio_cycles = 0
+        self.blocking_wakes = 0
+        self._ambient = None
+        self._target = dim
+        self._last_touch = time.monotonic()
+        self._esp = None
+        self._reset_pin = None
+        self._pool = None
+        self._radio_used = time.monotonic()
+        self._booted_at = 0.0  # when the ESP32 is up after the last warm_up
+        self._joining = False  # a warm_up is waiting for the ESP32
+        # energy accounting
+        self._start = time.monotonic()
+        self._last_tick = self._start
+        self._radio_seconds = 0.0
+        self._backlight_seconds = 0.0  # seconds at full brightness equivalent
+        self._joules = 0.0
+
+    def _apply(self, brightness):
+        if brightness != self.brightness:
+            self.brightness = brightness
+            self.set_backlight(brightness)
+
+    def ambient(self, reading):
+        """ feed a light sensor reading; moves the backlight if worth it """
+        if self._ambient is None:
+            self._ambient = reading
+        else:
+            self._ambient += self.smoothing * (reading - self._ambient)
+        share = (self._ambient - self.dark) / (self.light - self.dark)
+        target = self.dim + (self.bright - self.dim) * min(max(share, 0), 1)
+        if self.brightness is None or abs(target - self._target) > self.hysteresis:
+            self._target = target
+            if not self.asleep:
+                self._apply(target)
+
+    def touched(self):
+        """ a touch: keep the screen on, or wake it; True if it was asleep """
+        self._last_touch = time.monotonic()
+        if not self.asleep:
+            return False
+        self.asleep = False
+        self.wakes += 1
+        self._apply(self._target)
+        return True
+
+    @property
+    def radio_on(self) -> bool:
+        """ False while the ESP32 is held in reset """
+        return self._reset_pin is None or bool(self._reset_pin.value)
+
+    def attach_radio(self, esp, reset_pin, pool):
+        """ take over the ESP32's power; pool's sockets are closed before it goes down """
+        self._esp = esp
+        self._reset_pin = reset_pin
+        self._pool = pool
+
+    def radio_needed(self):
+        """ a request is about to go out: bring the radio up if it is down,
+        blocking the loop while it boots """
+        self._radio_used = time.monotonic()
+        if self._esp is None:
+            return
+        if not self.radio_on:
+            self.blocking_wakes += 1
+            self._esp.reset()  # releases the reset pin and waits for the boot
+            return
+        booting = self._booted_at - time.monotonic()
+        if booting > 0:
+            self.blocking_wakes += 1
+            time.sleep(booting)  # warm_up released it a moment ago
+
+    async def warm_up(self):
+        """ bring the radio up and joined, yielding while it boots and
+        associates; returns at once if it is already up """
+        self._radio_used = time.monotonic()
+        if self._esp is None:
+            return
+        if self.radio_on:
+            while self._joining:  # another task's warm_up is under way
+                await asyncio.sleep(JOIN_POLL)
+            return
+        self._joining = True
+        try:
+            self._reset_pin.value = True
+            self._booted_at = time.monotonic() + RADIO_BOOT
+            await asyncio.sleep(RADIO_BOOT)
+            # connect_AP without its blocking wait: the firmware joins by itself
+            wifi = self._pool.wifi
+            self._esp.wifi_set_passphrase(_encoded(wifi.ssid), _encoded(wifi.password))
+            deadline = time.monotonic() + JOIN_TIMEOUT
+            while not self._esp.is_connected and time.monotonic() < deadline:
+                await asyncio.sleep(JOIN_POLL)
+        finally:
+            self._joining = False
+        self._radio_used = time.monotonic()
+
+    def _radio_off(self):
+        self._pool.close_all()
+        self._reset_pin.value = False
+        self.radio_cycles += 1
+
+    def plan(self, next_fetch, busy=False) -> bool:
+        """ next_fetch: seconds until the next scheduled fetch, or None;
+        busy: a request is in flight, so the radio must stay up.  True
+        when the radio should come up now: await ``warm_up`` """
+        if self._esp is None or next_fetch is None:
+            return False
+        now = time.monotonic()
+        if self.radio_on:
+            if (not busy and next_fetch > self.radio_min_off + self.radio_warmup and
+                    now - self._radio_used > self.radio_idle):
+                self._radio_off()
+            return False
+        return next_fetch <= self.radio_warmup
+
+    def tick(self):
+        """ call about once a second: display sleep and energy accounting """
+        now = time.monotonic()
+        if not self.asleep and self.sleep_after and now - self._last_touch > self.sleep_after:
+            self.asleep = True
+            self._apply(0)
+        elapsed = now - self._last_tick
+        self._last_tick = now
+        backlight = self.brightness or 0
+        self._backlight_seconds += backlight * elapsed
+        if self.radio_on:
+            self._radio_seconds += elapsed
+        self._joules += elapsed * (BASE_WATTS + BACKLIGHT_WATTS * backlight +
+                                   (RADIO_WATTS if self.radio_on else RADIO_OFF_WATTS))
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        elapsed = max(self._last_tick - self._start, 1)
+        watts = self._joules / elapsed  # joules per second, i.e. Wh per hour
+        return (f"power: radio on {100 * self._radio_seconds / elapsed:.0f}% "
+                f"({self.radio_cycles} sleeps {self.blocking_wakes} blocking wakes) backlight {100 * self._backlight_seconds / elapsed:.0f}% "
+                f"{'asleep' if self.asleep else 'awake'} ({self.wakes} wakes) "
+                f"est {watts:.2f} Wh/h")
@@ -0,0 +1,71 @@
+# Dirty-tracking layer between the data functions and the Labels
+#
+# SPDX-License-Identifier: MIT
+
+
+def quantize(value, step):
+    """ round value to the nearest multiple of step so noise does not redraw """
+    return int((value + step / 2) // step * step)
+
+
+class ViewModel:
+    """ only touch a Label when what it shows actually changes
+
+    Every ``text`` assignment makes the Label re-lay-out its glyphs and
+    marks its area of the display dirty, so the last value written to each
+    label is remembered and repeats are dropped.  ``redraws`` counts the
+    writes that went through, ``skipped`` the ones that were avoided.
+    """
+
+    def __init__(self):
+        self.redraws = 0
+        self.skipped = 0
+        self._texts = {}
+        self._colors = {}
+        self._keys = {}
+
+    def stale(self, label, key) -> bool:
+        """ True if key (e.g. a tuple of raw readings) differs from the last one
+
+        Lets callers skip formatting a string that would not change.
+        """
+        if self._keys.get(id(label)) == key:
+            self.skipped += 1
+            return False
+        self._keys[id(label)] = key
+        return True
+
+    def text(self, label, text, clear=False) -> bool:
+        """ set label.text if it changed; clear first when the label needs it """
+        if self._texts.get(id(label)) == text:
+            self.skipped += 1
+            return False
+        if clear:
+            label.text = ""
+        label.text = text
+        self._texts[id(label)] = text
+        self.redraws += 1
+        return True
+
+    def color(self, label, color, background_color=None) -> bool:
+        """ recolor label if either color changed """
+        colors = (color, background_color)
+        if self._colors.get(id(label)) == colors:
+            self.skipped += 1
+            return False
+        label.color = color
+        if background_color is not None:
+            label.background_color = background_color
+        self._colors[id(label)] = colors
+        self.redraws += 1
+        return True
+
+    def forget(self, label):
+        """ drop what is known about label, e.g. after changing it directly """
+        self._texts.pop(id(label), None)
+        self._colors.pop(id(label), None)
+        self._keys.pop(id(label), None)
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return f"render: {self.redraws} redraws {self.skipped} skipped"
@@ -1,12 +1,24 @@
+import sys
 import time
 from os import getenv
 
 TESTING = True
+# with TESTING, requests go to the replay server: python sim/replay.py
+TEST_SERVER = "http://127.0.0.1:8080"
 TIME_API = "http://worldtimeapi.org/api/ip"
 RP_URL = "https://api.radioparadise.com/api/nowplaying_list_v2022?chan=0&source=The%20Main%20Mix&player_id=&sync_id=chan_0&type=channel&mode=wip-channel&list_num=4"
 WEATHER = "https://api.weather.gov/stations/KOWD/observations/latest"
+COVER_URL = "https://img.radioparadise.com/"
 
-if not TESTING:
+# python routine.py --hub [port] [--replay]: run under CPython as the LAN
+# hub the displays ask instead of the upstreams (RP_HUB in their
+# settings.toml); it polls the real upstreams, or with --replay the
+# replay server at TEST_SERVER, whatever TESTING says
+HUB = "--hub" in getattr(sys, "argv", ())
+HUB_REPLAY = HUB and "--replay" in sys.argv
+HUB_PORT = 8081
+
+if not TESTING and not HUB:
     import adafruit_connection_manager
     import adafruit_requests
     import board
@@ -52,18 +64,32 @@ if not TESTING:
 
 
 def alt_get_json(json_url: str, error_msg: str):
-    """ for testing on the mac
+    """ for testing on the mac, against the replay server
     """
-    import json 
-    import requests
-    while True:
-        try:
-            # print(f"Fetching json {json_url}")
-            response = requests.get(json_url)
-            return response.json()
-        except OSError as e:
-            print(f"Failed to {error_msg}, retrying {e}\n")
-            return
+    import json
+    from urllib.request import urlopen
+    host_and_path = json_url.split("://", 1)[1]
+    try:
+        with urlopen(f"{TEST_SERVER}/{host_and_path}") as response:
+            return json.load(response)
+    except OSError as e:
+        print(f"Failed to {error_msg}: {e}\n")
+        return
+
+def hub_fetch(url: str, headers: dict):
+    """ blocking GET for the hub: (status, lowercased headers, body)
+    """
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+    if HUB_REPLAY:
+        url = f"{TEST_SERVER}/{url.split('://', 1)[1]}"
+    try:
+        with urlopen(Request(url, headers=headers), timeout=20) as response:
+            return (response.status, {name.lower(): value for name, value in response.getheaders()},
+                    response.read())
+    except HTTPError as e:
+        return e.code, {name.lower(): value for name, value in e.headers.items()}, b""
+
 
 def get_json(json_url: str, error_msg: str):
     """ simplify getting the URL
@@ -124,6 +150,14 @@ def get_time() -> str:
 
 
 
+if HUB:
+    import asyncio
+    from channels import parse_channels
+    from hub import Hub
+    ports = [arg for arg in sys.argv[sys.argv.index("--hub") + 1:] if arg.isdigit()]
+    hub = Hub(hub_fetch, parse_channels(getenv("RP_CHANNELS") or "0,1,2,3"), WEATHER, COVER_URL)
+    asyncio.run(hub.run(port=int(ports[0]) if ports else HUB_PORT))
+
 set_time()
 
 while True:
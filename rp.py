@@ -0,0 +1,94 @@
+# Radio Paradise helpers for the PyPortal display
+#
+# SPDX-License-Identifier: MIT
+
+
+def song_end(song):
+    """ return the UTC epoch second the song ends, or None if unknown
+
+    ``nowplaying_list_v2022`` entries carry ``sched_time_millis`` (start,
+    epoch milliseconds) and ``duration``.  Older payloads gave the duration
+    in seconds, newer ones in milliseconds, so small values are taken as
+    seconds.
+    """
+    try:
+        start = int(song["sched_time_millis"]) / 1000
+        duration = int(song["duration"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if duration > 10000:
+        duration = duration / 1000
+    return start + duration
+
+
+def song_key(song):
+    """ something that changes when the track does """
+    return song.get("event") or song.get("song_id") or song.get("title")
+
+
+class MusicSchedule:
+    """ poll once just after the current track ends instead of on a timer
+
+        :param grace: seconds after the track end before polling, to let
+                      the API move on to the next song
+        :param fallback: longest wait between polls, used when the timing is
+                         unknown or the track is unusually long
+        :param retry: first wait when a poll fails or returns the same track
+                      after it should have ended; doubles up to ``fallback``
+        :param minimum: shortest wait between polls
+    """
+
+    def __init__(self, grace=3, fallback=300, retry=5, minimum=5):
+        self.grace = grace
+        self.fallback = fallback
+        self.retry = retry
+        self.minimum = minimum
+        self.end = None
+        self.key = None
+        self.polls = 0
+        self.changes = 0
+        self._late = 0  # polls in a row that still returned an ended track
+        self._failed = 0  # polls in a row that failed
+        self.failures = 0
+
+    def resume(self, song):
+        """ start from a cached song without counting it as a poll """
+        self.key = song_key(song)
+        self.end = song_end(song)
+
+    def update(self, song, now=None) -> bool:
+        """ record a freshly fetched song, return True if the track changed """
+        self.polls += 1
+        self._failed = 0
+        key = song_key(song)
+        changed = key != self.key
+        if changed:
+            self.key = key
+            self.changes += 1
+        self.end = song_end(song)
+        if now is not None and self.end is not None and self.end + self.grace <= now:
+            # the API has not moved on yet, back off gently
+            self._late += 1
+        else:
+            self._late = 0
+        return changed
+
+    def failed(self):
+        """ a poll got nothing; the next one backs off from ``retry`` """
+        self.failures += 1
+        self._failed += 1
+
+    def delay(self, now=None) -> float:
+        """ seconds until the next poll; ``now`` is UTC epoch seconds or None """
+        if self._failed:
+            return min(self.retry << min(self._failed - 1, 16), self.fallback)
+        if now is None or self.end is None:
+            return self.fallback
+        remaining = self.end + self.grace - now
+        if remaining <= 0:
+            return min(self.retry << max(self._late - 1, 0), self.fallback)
+        return max(self.minimum, min(remaining, self.fallback))
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return f"music: {self.polls} polls {self.changes} track changes {self.failures} failures"
@@ -0,0 +1,216 @@
+# Sensor sampling into fixed-size ring buffers with minute and hour rollups
+#
+# SPDX-License-Identifier: MIT
+import time
+from array import array
+
+import displayio
+
+try:
+    import bitmaptools
+except ImportError:
+    bitmaptools = None
+
+
+class Rollup:
+    """ min, max and mean of each closed interval, the last ``size`` of them """
+
+    def __init__(self, size):
+        self.size = size
+        self.low = array("f", [0] * size)
+        self.high = array("f", [0] * size)
+        self.mean = array("f", [0] * size)
+        self.count = 0  # intervals closed so far
+        self._reset()
+
+    def _reset(self):
+        self._low = None
+        self._high = None
+        self._sum = 0.0
+        self._n = 0
+
+    def add(self, low, high, value):
+        """ fold a sample (or a closed finer interval) into the open interval """
+        if self._n == 0 or low < self._low:
+            self._low = low
+        if self._n == 0 or high > self._high:
+            self._high = high
+        self._sum += value
+        self._n += 1
+
+    def close(self) -> bool:
+        """ store the open interval; False if it had no samples """
+        if self._n == 0:
+            return False
+        i = self.count % self.size
+        self.low[i] = self._low
+        self.high[i] = self._high
+        self.mean[i] = self._sum / self._n
+        self.count += 1
+        self._reset()
+        return True
+
+    def last(self):
+        """ (min, max, mean) of the newest closed interval, or None """
+        if not self.count:
+            return None
+        i = (self.count - 1) % self.size
+        return self.low[i], self.high[i], self.mean[i]
+
+    def span(self):
+        """ (min, max) over every interval held, or None """
+        held = min(self.count, self.size)
+        if not held:
+            return None
+        low = self.low[0]
+        high = self.high[0]
+        for i in range(1, held):
+            if self.low[i] < low:
+                low = self.low[i]
+            if self.high[i] > high:
+                high = self.high[i]
+        return low, high
+
+    @property
+    def nbytes(self) -> int:
+        return 3 * 4 * self.size
+
+
+class Series:
+    """ one sensor read every ``period`` seconds
+
+    The raw samples go into a ring of ``samples`` floats; per-minute and
+    per-hour min/max/mean are kept for the last ``minutes`` and ``hours``.
+    Everything is allocated up front, so memory (``nbytes``) does not grow
+    however long the board runs.  ``on_minute`` is called with the mean of
+    each minute as it closes.
+
+        :param name: label for the stats line
+        :param read: function returning the current value
+        :param period: seconds between reads
+        :param samples: raw samples kept
+        :param minutes: per-minute rollups kept
+        :param hours: per-hour rollups kept
+    """
+
+    def __init__(self, name, read, period, samples=60, minutes=60, hours=24):
+        self.name = name
+        self.read = read
+        self.period = period
+        self.raw = array("f", [0] * samples)
+        self.count = 0
+        self.minutes = Rollup(minutes)
+        self.hours = Rollup(hours)
+        self.on_minute = None
+        self.next_read = 0.0
+        self._minute = None
+        self._hour = None
+
+    @property
+    def latest(self):
+        if not self.count:
+            return None
+        return self.raw[(self.count - 1) % len(self.raw)]
+
+    def add(self, value, now):
+        """ record value read at now (epoch or monotonic seconds) """
+        minute = int(now // 60)
+        if self._minute is not None and minute != self._minute:
+            if self.minutes.close():
+                low, high, mean = self.minutes.last()
+                self.hours.add(low, high, mean)
+                if self.on_minute:
+                    self.on_minute(mean)
+        hour = minute // 60
+        if self._hour is not None and hour != self._hour:
+            self.hours.close()
+        self._minute = minute
+        self._hour = hour
+        self.raw[self.count % len(self.raw)] = value
+        self.count += 1
+        self.minutes.add(value, value, value)
+
+    @property
+    def nbytes(self) -> int:
+        return 4 * len(self.raw) + self.minutes.nbytes + self.hours.nbytes
+
+
+class Sampler:
+    """ read each Series when it is due; ``poll()`` returns seconds to the next """
+
+    def __init__(self, series):
+        self.series = series
+        self.reads = 0
+
+    def poll(self) -> float:
+        now = time.monotonic()
+        for series in self.series:
+            if now >= series.next_read:
+                series.add(series.read(), now)
+                series.next_read = now + series.period
+                self.reads += 1
+        return max(min(series.next_read for series in self.series) - now, 0)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(series.nbytes for series in self.series)
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return (f"sensors: {self.reads} reads {self.nbytes} bytes of history " +
+                " ".join(f"{series.name} {series.latest:.0f}" for series in self.series
+                         if series.count))
+
+
+class Sparkline:
+    """ a small graph drawn one column at a time, like a chart recorder
+
+    Each ``push`` draws a single column at the write position (a line from
+    the previous value, so steps stay connected) and blanks the column
+    after it, which marks where the newest value is.  Nothing else on the
+    bitmap is touched, so only that column is refreshed on the display.
+
+        :param width: columns, i.e. values shown
+        :param height: pixels between low and high
+        :param low: value drawn on the bottom row
+        :param high: value drawn on the top row
+        :param color: line color
+    """
+
+    def __init__(self, width, height, low, high, color=0x03AD31):
+        self.width = width
+        self.height = height
+        self.low = low
+        self.high = high
+        self.bitmap = displayio.Bitmap(width, height, 2)
+        palette = displayio.Palette(2)
+        palette[0] = 0x000000
+        palette[1] = color
+        palette.make_transparent(0)
+        self.grid = displayio.TileGrid(self.bitmap, pixel_shader=palette)
+        self._x = 0
+        self._last_y = None
+
+    def _row(self, value) -> int:
+        value = min(max(value, self.low), self.high)
+        return int((self.high - value) * (self.height - 1) / (self.high - self.low))
+
+    def _clear(self, x):
+        if bitmaptools:
+            bitmaptools.fill_region(self.bitmap, x, 0, x + 1, self.height, 0)
+            return
+        for y in range(self.height):
+            self.bitmap[x, y] = 0
+
+    def push(self, value):
+        x = self._x
+        y = self._row(value)
+        self._clear(x)
+        top, bottom = y, y
+        if self._last_y is not None and x:
+            top, bottom = min(y, self._last_y), max(y, self._last_y)
+        for row in range(top, bottom + 1):
+            self.bitmap[x, row] = 1
+        self._last_y = y
+        self._x = (x + 1) % self.width
+        self._clear(self._x)
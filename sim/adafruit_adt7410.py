@@ -0,0 +1,9 @@
+# Host stand-in for adafruit_adt7410: a sensor that always reads 21.5 C
+#
+# SPDX-License-Identifier: MIT
+
+
+class ADT7410:
+    def __init__(self, i2c, address=0x48):
+        self.temperature = 21.5
+        self.high_resolution = False
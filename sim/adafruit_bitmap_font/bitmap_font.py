@@ -0,0 +1,55 @@
+# Host stand-in for adafruit_bitmap_font: synthetic glyphs sized from the file name
+#
+# SPDX-License-Identifier: MIT
+import re
+
+import displayio
+from fontio import Glyph
+
+
+class StandInFont:
+    """ a BDF-like font: glyph size comes from the number in the file name
+
+    Code points above U+2000 are reported missing, like the punctuation the
+    real BDF files lack.  ``loads`` counts ``load_glyphs`` calls, each of
+    which would be a scan of the BDF file on the device.
+    """
+
+    def __init__(self, path):
+        match = re.search(r"(\d+)", path.rsplit("/", 1)[-1])
+        self.size = int(match.group(1)) if match else 16
+        self.bitmap_class = displayio.Bitmap
+        self._glyphs = {}
+        self.loads = 0
+
+    def get_bounding_box(self):
+        return (self.size, self.size + self.size // 4, 0, -(self.size // 4))
+
+    def load_glyphs(self, code_points):
+        self.loads += 1
+        if isinstance(code_points, str):
+            code_points = [ord(c) for c in code_points]
+        elif isinstance(code_points, int):
+            code_points = [code_points]
+        for code in list(code_points):
+            if code in self._glyphs:
+                continue
+            if code > 0x2000:
+                self._glyphs[code] = None
+                continue
+            width = self.size // 2 + (code % 3) if code != 32 else self.size // 3
+            height = self.size
+            bitmap = displayio.Bitmap(width, height, 2)
+            for y in range(height):
+                bitmap[(code + y) % width, y] = 1
+            self._glyphs[code] = Glyph(bitmap, 0, width, height, 0, -(self.size // 4),
+                                       width + 1, 0)
+
+    def get_glyph(self, code):
+        if code not in self._glyphs:
+            self.load_glyphs([code])
+        return self._glyphs.get(code)
+
+
+def load_font(path, bitmap=None):
+    return StandInFont(path)
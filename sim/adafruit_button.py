@@ -0,0 +1,17 @@
+# Host stand-in for adafruit_button: geometry and selection only
+#
+# SPDX-License-Identifier: MIT
+import displayio
+
+
+class Button(displayio.Group):
+    def __init__(self, *, x, y, width, height, label=None, label_font=None, **kwargs):
+        super().__init__(x=x, y=y)
+        self.width = width
+        self.height = height
+        self.label = label
+        self.selected = False
+
+    def contains(self, point):
+        return (self.x <= point[0] <= self.x + self.width
+                and self.y <= point[1] <= self.y + self.height)
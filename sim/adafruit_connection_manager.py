@@ -0,0 +1,104 @@
+# Host stand-in for adafruit_connection_manager: every host resolves to the replay server
+# except LAN addresses (such as a hub from routine.py --hub), which are connected to
+#
+# SPDX-License-Identifier: MIT
+import os
+import http.client
+from urllib.parse import urlsplit
+
+# where sim/replay.py listens; read when a socket is opened so runners can set it
+DEFAULT_SERVER = "http://127.0.0.1:8080"
+
+
+class _SocketPool:
+    pass
+
+
+class _SSLContext:
+    pass
+
+
+def is_lan(host) -> bool:
+    """ True for an IP address or localhost, which the sim connects to directly """
+    name = host.split(":")[0]
+    return name == "localhost" or name.replace(".", "").isdigit()
+
+
+_POOL = _SocketPool()
+_SSL_CONTEXT = _SSLContext()
+_managers = {}
+
+
+def get_radio_socketpool(radio):
+    return _POOL
+
+
+def get_radio_ssl_context(radio):
+    return _SSL_CONTEXT
+
+
+def get_connection_manager(socket_pool):
+    if socket_pool not in _managers:
+        _managers[socket_pool] = ConnectionManager(socket_pool)
+    return _managers[socket_pool]
+
+
+class ConnectionManager:
+    """ same bookkeeping as the real one; the "sockets" are HTTPConnections
+    to the replay server, and ``connects`` counts how many were opened """
+
+    def __init__(self, socket_pool):
+        self._socket_pool = socket_pool
+        self._available_sockets = set()
+        self._key_by_managed_socket = {}
+        self._managed_socket_by_key = {}
+        self.connects = 0
+
+    @property
+    def available_socket_count(self):
+        return len(self._available_sockets)
+
+    @property
+    def managed_socket_count(self):
+        return len(self._managed_socket_by_key)
+
+    def get_socket(self, host, port, proto, session_id=None, *, timeout=1.0, is_ssl=False,
+                   ssl_context=None):
+        key = (host, port, proto, session_id)
+        if key in self._managed_socket_by_key:
+            socket = self._managed_socket_by_key[key]
+            if socket in self._available_sockets:
+                self._available_sockets.remove(socket)
+                return socket
+            raise RuntimeError(f"An existing socket is already connected to {proto}//{host}:{port}")
+        if proto == "https:" and any(k[2] == "https:" for k in self._managed_socket_by_key):
+            # the ESP32 firmware allows one TLS socket; like the real manager,
+            # free the idle sockets and try once more
+            if not self._available_sockets:
+                raise OSError(23, "Only one open SSL connection allowed")
+            for idle in list(self._available_sockets):
+                self.close_socket(idle)
+            return self.get_socket(host, port, proto, session_id, timeout=timeout)
+        if is_lan(host):
+            socket = http.client.HTTPConnection(host.split(":")[0], port, timeout=timeout)
+        else:
+            server = urlsplit(os.environ.get("SIM_SERVER", DEFAULT_SERVER))
+            socket = http.client.HTTPConnection(server.hostname, server.port, timeout=timeout)
+        socket.connect()
+        self.connects += 1
+        self._key_by_managed_socket[socket] = key
+        self._managed_socket_by_key[key] = socket
+        return socket
+
+    def close_socket(self, socket):
+        if socket not in self._key_by_managed_socket:
+            raise RuntimeError("Socket not managed")
+        socket.close()
+        key = self._key_by_managed_socket.pop(socket)
+        del self._managed_socket_by_key[key]
+        self._available_sockets.discard(socket)
+
+    def free_socket(self, socket):
+        if socket not in self._key_by_managed_socket:
+            raise RuntimeError("Socket not managed")
+        self._available_sockets.add(socket)
@@ -0,0 +1,42 @@
+# Host stand-in for adafruit_display_text.label, counting text assignments
+#
+# SPDX-License-Identifier: MIT
+import displayio
+
+
+class Label(displayio.Group):
+    """ keeps text and colors; every ``text`` assignment is counted, and
+    looks up each glyph the way the real Label does """
+
+    assignments = 0
+
+    def __init__(self, font, *, text="", color=0xFFFFFF, background_color=None,
+                 anchor_point=None, anchored_position=None, scale=1, **kwargs):
+        super().__init__(scale=scale)
+        self.font = font
+        self.color = color
+        self.background_color = background_color
+        self.anchor_point = anchor_point
+        self.anchored_position = anchored_position
+        self._text = ""
+        self.text = text
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        Label.assignments += 1
+        for char in value:
+            self.font.get_glyph(ord(char))
+        self._text = value
+
+    @property
+    def bounding_box(self):
+        lines = self._text.split("\n")
+        width = 0
+        for line in lines:
+            glyphs = (self.font.get_glyph(ord(c)) for c in line)
+            width = max(width, sum(g.shift_x for g in glyphs if g))
+        return (0, 0, width, self.font.get_bounding_box()[1] * len(lines))
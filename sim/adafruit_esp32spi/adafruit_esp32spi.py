@@ -0,0 +1,47 @@
+# Host stand-in for the ESP32 co-processor
+#
+# SPDX-License-Identifier: MIT
+import time
+
+ASSOCIATE = 2.0  # seconds joining the access point takes, as a real ESP32 might
+
+
+class ESP_SPIcontrol:
+    """ associated until reset; held in reset while its reset pin is low
+
+    A join started with ``wifi_set_passphrase`` completes ``ASSOCIATE``
+    seconds later, as the real firmware does in the background; the
+    WiFiManager's blocking ``connect`` waits that long instead.
+    """
+
+    def __init__(self, spi=None, cs=None, ready=None, reset=None, *args, **kwargs):
+        self._reset_pin = reset
+        self._joined = True
+        self._join_at = None
+        self.resets = 0
+        if reset is not None:
+            reset.watchers.append(self._reset_changed)
+
+    def _reset_changed(self, value):
+        if not value:
+            self._joined = False  # powered down: forgets the access point
+            self._join_at = None
+
+    @property
+    def is_connected(self):
+        powered = self._reset_pin is None or self._reset_pin.value
+        if self._join_at is not None and time.monotonic() >= self._join_at:
+            self._joined = True
+            self._join_at = None
+        return bool(powered and self._joined)
+
+    def wifi_set_passphrase(self, ssid, passphrase):
+        self._join_at = time.monotonic() + ASSOCIATE
+
+    def reset(self):
+        if self._reset_pin is not None:
+            self._reset_pin.value = True
+        self._joined = False
+        self._join_at = None
+        self.resets += 1
+        time.sleep(0.75)  # the real driver waits this long for the ESP32 to boot
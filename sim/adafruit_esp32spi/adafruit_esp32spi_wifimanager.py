@@ -0,0 +1,29 @@
+# Host stand-in for the ESP32SPI WiFiManager
+#
+# SPDX-License-Identifier: MIT
+import time
+
+import adafruit_connection_manager
+import adafruit_requests
+
+from .adafruit_esp32spi import ASSOCIATE
+
+
+class WiFiManager:
+    def __init__(self, esp, ssid, password, status_pixel=None, **kwargs):
+        self.esp = esp
+        self.ssid = ssid
+        self.password = password
+        pool = adafruit_connection_manager.get_radio_socketpool(esp)
+        ssl_context = adafruit_connection_manager.get_radio_ssl_context(esp)
+        self._requests = adafruit_requests.Session(pool, ssl_context)
+
+    def connect(self):
+        time.sleep(ASSOCIATE)  # the real one blocks through the association and DHCP
+        self.esp._joined = True
+
+    def reset(self):
+        self.esp.reset()
+
+    def get(self, url, **kwargs):
+        return self._requests.get(url, **kwargs)
@@ -0,0 +1,7 @@
+# Host stand-in for adafruit_pyportal (imported, never used)
+#
+# SPDX-License-Identifier: MIT
+
+
+class PyPortal:
+    pass
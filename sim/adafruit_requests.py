@@ -0,0 +1,114 @@
+# Host stand-in for adafruit_requests over http.client
+#
+# SPDX-License-Identifier: MIT
+import json as json_module
+import http.client
+
+from adafruit_connection_manager import get_connection_manager, is_lan
+
+
+class OutOfRetries(Exception):
+    """ raised, like the real library, when the socket keeps failing """
+
+
+class Response:
+    """ the parts of adafruit_requests.Response the display uses; the body
+    is streamed from the socket, not read up front """
+
+    def __init__(self, socket, session, raw):
+        self.socket = socket
+        self._session = session
+        self._raw = raw
+        self.status_code = raw.status
+        self.reason = raw.reason
+        # adafruit_requests lowercases header names
+        self.headers = {name.lower(): value for name, value in raw.getheaders()}
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        while True:
+            chunk = self._raw.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        self.close()
+
+    def _readinto(self, buf):
+        """ the real library's body reader, which iter_content is built on """
+        return self._raw.readinto(memoryview(buf)) or 0
+
+    @property
+    def content(self):
+        data = self._raw.read()
+        self.close()
+        return data
+
+    @property
+    def text(self):
+        return str(self.content, "utf-8")
+
+    def json(self):
+        return json_module.loads(self.content)
+
+    def close(self):
+        if not self.socket:
+            return
+        manager = self._session._connection_manager
+        if self._raw.isclosed():
+            manager.free_socket(self.socket)
+        else:
+            # the real library would hand back a socket with unread bytes on it
+            manager.close_socket(self.socket)
+        self.socket = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Session:
+    """ keeps one connection per host through the connection manager and
+    retries once on a stale one, as the real Session does """
+
+    def __init__(self, socket_pool, ssl_context=None, session_id=None):
+        self._connection_manager = get_connection_manager(socket_pool)
+        self._ssl_context = ssl_context
+        self._session_id = session_id
+        self._last_response = None
+
+    def request(self, method, url, data=None, json=None, headers=None, stream=False,
+                timeout=60):
+        proto, _, host, path = (url.split("/", 3) + [""])[:4]
+        port = 443 if proto == "https:" else 80
+        if ":" in host:
+            port = int(host.rsplit(":", 1)[1])
+        if json is not None:
+            data = json_module.dumps(json)
+        if self._last_response:
+            self._last_response.close()
+            self._last_response = None
+        last_exc = None
+        for _ in range(2):
+            socket = self._connection_manager.get_socket(
+                host, port, proto, session_id=self._session_id, timeout=timeout,
+                ssl_context=self._ssl_context)
+            try:
+                # the replay server takes the original host as the first path part
+                target = f"/{path}" if is_lan(host) else f"/{host}/{path}"
+                socket.request(method, target, body=data, headers=headers or {})
+                raw = socket.getresponse()
+                break
+            except TimeoutError:
+                self._connection_manager.close_socket(socket)
+                raise
+            except (OSError, http.client.HTTPException) as exc:
+                self._connection_manager.close_socket(socket)
+                last_exc = exc
+        else:
+            raise OutOfRetries("Repeated socket failures") from last_exc
+        self._last_response = Response(socket, self, raw)
+        return self._last_response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
@@ -0,0 +1,20 @@
+# Host stand-in for adafruit_touchscreen, replaying a scripted list of touches
+#
+# SPDX-License-Identifier: MIT
+import time
+
+# (start, end, (x, y, pressure)): seconds after the Touchscreen was created
+script = []
+
+
+class Touchscreen:
+    def __init__(self, *args, **kwargs):
+        self.start = time.monotonic()
+
+    @property
+    def touch_point(self):
+        now = time.monotonic() - self.start
+        for start, end, point in script:
+            if start <= now < end:
+                return point
+        return None
@@ -0,0 +1,24 @@
+# Host stand-in for board: pin names and a display that counts refreshes
+#
+# SPDX-License-Identifier: MIT
+
+
+class _Display:
+    width = 320
+    height = 240
+
+    def __init__(self):
+        self.brightness = 1.0
+        self.auto_brightness = True
+        self.root_group = None
+        self.refreshes = 0
+
+    def refresh(self, **kwargs):
+        self.refreshes += 1
+        return True
+
+
+DISPLAY = _Display()
+for _name in ("ESP_CS ESP_BUSY ESP_RESET SCK MOSI MISO NEOPIXEL LIGHT SCL SDA "
+              "TOUCH_XL TOUCH_XR TOUCH_YD TOUCH_YU").split():
+    globals()[_name] = _name
@@ -0,0 +1,25 @@
+# Host stand-in for digitalio
+#
+# SPDX-License-Identifier: MIT
+
+
+class DigitalInOut:
+    def __init__(self, pin):
+        self._value = True
+        self.direction = None
+        self.watchers = []  # called with each new value, for other stand-ins
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        for watcher in self.watchers:
+            watcher(value)
+
+
+class Direction:
+    INPUT = 0
+    OUTPUT = 1
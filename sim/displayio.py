@@ -0,0 +1,125 @@
+# Host stand-in for displayio: groups, bitmaps and palettes without pixels
+#
+# SPDX-License-Identifier: MIT
+import struct
+from array import array
+
+
+class Group:
+    def __init__(self, *, scale=1, x=0, y=0):
+        self._items = []
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+    def append(self, item):
+        if item in self._items:
+            raise ValueError("Layer already in a group")
+        self._items.append(item)
+
+    def insert(self, index, item):
+        self._items.insert(index, item)
+
+    def remove(self, item):
+        self._items.remove(item)
+
+    def pop(self, i=-1):
+        return self._items.pop(i)
+
+    def index(self, item):
+        return self._items.index(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, i):
+        return self._items[i]
+
+    def __contains__(self, item):
+        return item in self._items
+
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self._data = bytearray(width * height) if value_count <= 256 else array("H", bytes(2 * width * height))
+
+    def _index(self, xy):
+        if isinstance(xy, tuple):
+            return xy[1] * self.width + xy[0]
+        return xy
+
+    def __setitem__(self, xy, value):
+        self._data[self._index(xy)] = value
+
+    def __getitem__(self, xy):
+        return self._data[self._index(xy)]
+
+    def fill(self, value):
+        for i in range(len(self._data)):
+            self._data[i] = value
+
+
+class Palette:
+    def __init__(self, color_count):
+        self._colors = [0] * color_count
+
+    def __setitem__(self, i, color):
+        self._colors[i] = color
+
+    def __getitem__(self, i):
+        return self._colors[i]
+
+    def __len__(self):
+        return len(self._colors)
+
+    def make_transparent(self, i):
+        pass
+
+
+class ColorConverter:
+    pass
+
+
+class OnDiskBitmap:
+    """ reads the BMP header, so a malformed file fails here as on the device;
+    images that are not in the tree (the background) are taken as full screen """
+
+    def __init__(self, file):
+        try:
+            with open(file, "rb") as f:
+                header = f.read(54)
+        except OSError:
+            self.width, self.height = 320, 240
+            self.pixel_shader = Palette(2)
+            return
+        if header[:2] != b"BM":
+            raise ValueError("Invalid BMP file")
+        self.width, self.height, _, bits = struct.unpack("<iiHH", header[18:30])
+        self.pixel_shader = Palette(1 << bits if bits <= 8 else 2)
+
+
+class TileGrid:
+    def __init__(self, bitmap, *, pixel_shader=None, width=1, height=1,
+                 tile_width=None, tile_height=None, default_tile=0, x=0, y=0):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._tiles = [default_tile] * (width * height)
+
+    def _index(self, i):
+        if isinstance(i, tuple):
+            return i[1] * self.width + i[0]
+        return i
+
+    def __setitem__(self, i, tile):
+        self._tiles[self._index(i)] = tile
+
+    def __getitem__(self, i):
+        return self._tiles[self._index(i)]
@@ -0,0 +1,10 @@
+# Host stand-in for fontio
+#
+# SPDX-License-Identifier: MIT
+from collections import namedtuple
+
+Glyph = namedtuple("Glyph", "bitmap tile_index width height dx dy shift_x shift_y")
+
+
+class BuiltinFont:
+    pass
@@ -0,0 +1,15 @@
+# Host stand-in for microcontroller: CPU temperature and an 8 KB nvm
+#
+# SPDX-License-Identifier: MIT
+
+
+class _CPU:
+    temperature = 30.0
+
+
+cpu = _CPU()
+nvm = bytearray(8192)
+
+
+def reset():
+    raise SystemExit("microcontroller.reset")
@@ -0,0 +1,9 @@
+# Host stand-in for neopixel
+#
+# SPDX-License-Identifier: MIT
+
+
+class NeoPixel(list):
+    def __init__(self, pin, n, brightness=1.0, **kwargs):
+        super().__init__([0] * n)
+        self.brightness = brightness
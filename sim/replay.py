@@ -0,0 +1,288 @@
+# Local HTTP server replaying recorded Radio Paradise, time and weather.gov payloads
+#
+# Run from the repository root:
+#
+#     python sim/replay.py [--port 8080] [--latency 0.3] [--jitter 0.2]
+#                          [--fail 0.1] [--reset 0.05] [--track-seconds 30]
+#
+# Requests arrive as http://127.0.0.1:8080/<host>/<path>, which is what the
+# WiFiManager stand-in and routine.py's TESTING mode send.  The payloads
+# come from bench/payloads; the time payload is regenerated for the current
+# moment, and the playlist is rotated so the recorded tracks keep playing
+# one after another.  Cover images (img.radioparadise.com) are stand-in
+# JPEGs that sim/jpegio.py understands.  GET /_stats returns the request
+# counts as JSON.
+#
+# SPDX-License-Identifier: MIT
+import os
+import sys
+import json
+import time
+import random
+import struct
+import zlib
+import argparse
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# the rtc stand-in may take over time.time(); the server keeps real time
+_host_time = time.time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PAYLOADS = os.path.join(os.path.dirname(HERE), "bench", "payloads")
+ROUTES = (
+    ("radioparadise", "rp_nowplaying.json"),
+    ("weather.gov", "weather_latest.json"),
+    ("time.now", "time_ip.json"),
+    ("worldtimeapi", "time_ip.json"),
+)
+
+
+def _channel(query):
+    for part in query.split("&"):
+        if part.startswith("chan="):
+            return int(part[5:] or 0)
+    return 0
+
+
+def _offset_seconds(utc_offset):
+    sign = -1 if utc_offset[0] == "-" else 1
+    hours, minutes = (int(x) for x in utc_offset[1:].split(":"))
+    return sign * (hours * 3600 + minutes * 60)
+
+
+class Replay:
+    """ the recorded payloads, adjusted to the moment they are served
+
+        :param payload_dir: directory holding the recorded JSON files
+        :param track_seconds: play every track this long instead of its
+                              recorded duration, to see track changes sooner;
+                              at least 11, as durations in milliseconds up to
+                              10000 read as seconds (see rp.song_end)
+    """
+
+    def __init__(self, payload_dir=PAYLOADS, track_seconds=None):
+        if track_seconds is not None and track_seconds <= 10:
+            raise ValueError("track_seconds must be over 10")
+        self.track_seconds = track_seconds
+        self._recorded = {}
+        for _, name in ROUTES:
+            with open(os.path.join(payload_dir, name), "rb") as f:
+                self._recorded[name] = json.load(f)
+
+    def body(self, host, query=""):
+        """ the payload for host as bytes, or None if there is none """
+        if host.startswith("img."):
+            return self._cover()
+        for key, name in ROUTES:
+            if key in host:
+                if name == "time_ip.json":
+                    return json.dumps(self._time()).encode()
+                if name == "rp_nowplaying.json":
+                    return json.dumps(self._playlist(_channel(query))).encode()
+                return json.dumps(self._recorded[name]).encode()
+        return None
+
+    def _cover(self, size=100):
+        """ SOI marker, the image size, then filler up to a typical JPEG's length """
+        return b"\xff\xd8" + struct.pack(">HH", size, size) + bytes(range(256)) * 24
+
+    def _time(self):
+        payload = dict(self._recorded["time_ip.json"])
+        now = _host_time()
+        offset = payload["utc_offset"]
+        local = time.gmtime(now + _offset_seconds(offset))
+        utc = time.gmtime(now)
+        micros = int(now % 1 * 1000000)
+        payload["datetime"] = time.strftime("%Y-%m-%dT%H:%M:%S", local) + f".{micros:06d}{offset}"
+        payload["utc_datetime"] = time.strftime("%Y-%m-%dT%H:%M:%S", utc) + f".{micros:06d}+00:00"
+        payload["unixtime"] = int(now)
+        payload["day_of_week"] = (local.tm_wday + 1) % 7  # Sunday is 0
+        payload["day_of_year"] = local.tm_yday
+        payload["week_number"] = int(time.strftime("%V", local))
+        return payload
+
+    def _playlist(self, chan=0):
+        """ the recorded list as if playing now; each channel starts chan
+        tracks further on and a few seconds off, so channels change tracks at
+        different times """
+        payload = dict(self._recorded["rp_nowplaying.json"])
+        played = list(reversed(payload["song"]))  # oldest first
+        played = played[chan % len(played):] + played[:chan % len(played)]
+        durations = [int(self.track_seconds * 1000) if self.track_seconds else song["duration"]
+                     for song in played]
+        now_ms = int(_host_time() * 1000)
+        position = (now_ms + chan * 4321) % sum(durations)
+        current = 0
+        while position >= durations[current]:
+            position -= durations[current]
+            current += 1
+        start = now_ms - position
+        songs = []
+        for back in range(len(played)):
+            i = (current - back) % len(played)
+            if back:
+                start -= durations[i]
+            song = dict(played[i])
+            song["sched_time_millis"] = start
+            song["duration"] = durations[i]
+            songs.append(song)
+        payload["song"] = songs
+        payload["server_time"] = now_ms
+        return payload
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """ HTTP server with injectable latency and failures
+
+        :param address: (host, port) to listen on; port 0 picks a free one
+        :param replay: the Replay producing the bodies
+        :param latency: seconds added before every response
+        :param jitter: up to this many extra seconds, chosen at random
+        :param fail: share of requests answered with a 503
+        :param reset: share of requests whose connection is dropped unanswered
+        :param seed: seed for the failure and jitter choices
+        :param keepalive: seconds an idle keep-alive connection stays open
+        :param max_age: Cache-Control max-age sent with the weather
+                        observation, which also gets an ETag and
+                        Last-Modified and answers conditional requests with 304
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, replay, latency=0.0, jitter=0.0, fail=0.0, reset=0.0,
+                 seed=None, keepalive=30, max_age=30):
+        super().__init__(address, _Handler)
+        self.replay = replay
+        self.latency = latency
+        self.jitter = jitter
+        self.fail = fail
+        self.reset = reset
+        self.random = random.Random(seed)
+        self.keepalive = keepalive
+        self.max_age = max_age
+        self.started = _host_time()
+        self.not_modified = 0
+        self.counts = {}
+        self.failures = 0
+        self.resets = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stats(self) -> dict:
+        return {"requests": dict(self.counts), "failures": self.failures,
+                "resets": self.resets, "not_modified": self.not_modified,
+                "connections": self.connections}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        self.timeout = self.server.keepalive
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=()):
+        self.send_response(status)
+        self.send_header("Date", formatdate(_host_time(), usegmt=True))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        if self.path == "/_stats":
+            self._send(200, json.dumps(server.stats()).encode())
+            return
+        host = self.path.split("/")[1]
+        with server._lock:
+            server.counts[host] = server.counts.get(host, 0) + 1
+            delay = server.latency + server.random.random() * server.jitter
+            roll = server.random.random()
+        time.sleep(delay)
+        if roll < server.reset:
+            with server._lock:
+                server.resets += 1
+            self.close_connection = True
+            return
+        if roll < server.reset + server.fail:
+            with server._lock:
+                server.failures += 1
+            self._send(503, b"Service Unavailable", "text/plain")
+            return
+        body = server.replay.body(host, self.path.partition("?")[2])
+        if body is None:
+            self._send(404, b"Not Found", "text/plain")
+            return
+        if "weather.gov" in host:
+            self._send_cacheable(body)
+            return
+        self._send(200, body, "image/jpeg" if host.startswith("img.") else "application/json")
+
+    def _send_cacheable(self, body):
+        """ the recorded observation never changes, so it is as old as the server """
+        server = self.server
+        etag = '"%08x"' % zlib.crc32(body)
+        modified = formatdate(server.started, usegmt=True)
+        headers = (("Cache-Control", f"public, max-age={server.max_age}"),
+                   ("ETag", etag), ("Last-Modified", modified))
+        if (self.headers.get("If-None-Match") == etag or
+                self.headers.get("If-Modified-Since") == modified):
+            with server._lock:
+                server.not_modified += 1
+            self._send(304, b"", headers=headers)
+            return
+        self._send(200, body, headers=headers)
+
+
+def serve(port=0, **kwargs) -> ReplayServer:
+    """ start a ReplayServer on a background thread and return it
+
+    Keyword arguments go to ReplayServer, except track_seconds and
+    payload_dir which go to Replay.
+    """
+    replay = Replay(kwargs.pop("payload_dir", PAYLOADS), kwargs.pop("track_seconds", None))
+    server = ReplayServer(("127.0.0.1", port), replay, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="replay recorded API payloads")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--fail", type=float, default=0.0)
+    parser.add_argument("--reset", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--keepalive", type=float, default=30)
+    parser.add_argument("--max-age", type=int, default=30)
+    parser.add_argument("--track-seconds", type=float)
+    parser.add_argument("--payloads", default=PAYLOADS)
+    args = parser.parse_args(argv)
+    server = ReplayServer(("127.0.0.1", args.port), Replay(args.payloads, args.track_seconds),
+                          args.latency, args.jitter, args.fail, args.reset, args.seed,
+                          args.keepalive, args.max_age)
+    print(f"replaying {args.payloads} on {server.url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
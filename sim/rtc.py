@@ -0,0 +1,45 @@
+# Host stand-in for rtc: a settable clock layered over the host's
+#
+# SPDX-License-Identifier: MIT
+import calendar
+import time
+
+# CircuitPython's time.time() and time.localtime() read the RTC, which
+# holds local time with no zone attached.  take_over_time() makes the host
+# behave the same way, so setting RTC.datetime moves what the program sees.
+_host_time = time.time
+_offset = 0.0
+sets = []  # every struct_time written to an RTC
+
+
+def _rtc_time():
+    return _host_time() + _offset
+
+
+def _rtc_localtime(secs=None):
+    return time.gmtime(_rtc_time() if secs is None else secs)
+
+
+def take_over_time(start=None):
+    """ route time.time() and time.localtime() through the stand-in RTC
+
+    start is the epoch second the RTC reads now, e.g. 946684800 for the
+    2000-01-01 a board wakes up with after a power cycle.
+    """
+    global _offset
+    if start is not None:
+        _offset = start - _host_time()
+    time.time = _rtc_time
+    time.localtime = _rtc_localtime
+
+
+class RTC:
+    @property
+    def datetime(self):
+        return _rtc_localtime()
+
+    @datetime.setter
+    def datetime(self, value):
+        global _offset
+        _offset = calendar.timegm(tuple(value)[:6] + (0, 0, 0)) - _host_time()
+        sets.append(value)
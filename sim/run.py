@@ -0,0 +1,124 @@
+# Run display.py on a Linux or macOS host
+#
+# Run from the repository root:
+#
+#     python sim/run.py [--seconds 20] [--touch 2.0,150,20 ...] [--latency 0.3]
+#                       [--fail 0.1] [--reset 0.05] [--track-seconds 30]
+#
+# The modules in this directory stand in for the CircuitPython hardware,
+# display and network libraries, and requests go to a replay server
+# (sim/replay.py) started in-process.  Files the program writes under
+# device paths such as /glyphs land in a temporary directory instead.
+# After --seconds the stats lines of every component are printed.
+#
+# SPDX-License-Identifier: MIT
+import os
+import sys
+import time
+import argparse
+import builtins
+import tempfile
+import threading
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(1, ROOT)
+
+import replay  # noqa: E402  (before rtc takes over time.time)
+import rtc  # noqa: E402
+import adafruit_touchscreen  # noqa: E402
+
+POWER_ON = 946684800  # 2000-01-01, where the RTC starts after a power cycle
+
+
+def device_files(root=None) -> str:
+    """ send opens of device paths (/glyphs/...) to a host directory
+
+    Any absolute path whose first directory does not exist on the host is
+    taken to be a device path.  Returns the directory used.
+    """
+    root = root or tempfile.mkdtemp(prefix="circuitpy-")
+    host_dirs = set(os.listdir("/"))
+
+    def device(path):
+        if isinstance(path, str) and path.startswith("/") and path.split("/")[1] not in host_dirs:
+            return root + path
+        return path
+
+    host_open = builtins.open
+    builtins.open = lambda file, *args, **kwargs: host_open(device(file), *args, **kwargs)
+    for name in ("stat", "mkdir", "listdir", "remove", "rename", "rmdir"):
+        func = getattr(os, name)
+        setattr(os, name, lambda *args, _func=func, **kwargs:
+                _func(*[device(a) for a in args], **kwargs))
+    return root
+
+
+def start(touches=(), server=None, warm=False, timeout=10):
+    """ import display.py on a background thread and return the module
+
+    touches are (seconds after start, x, y) taps of 0.2 s each.  With warm,
+    the RTC keeps the host time as after a reload; otherwise it starts at
+    2000-01-01 like a board that was just powered on.
+    """
+    if server:
+        os.environ["SIM_SERVER"] = server.url
+    adafruit_touchscreen.script = [(at, at + 0.2, (int(x), int(y), 1000)) for at, x, y in touches]
+    rtc.take_over_time(None if warm else POWER_ON)
+
+    def run():
+        import display  # noqa: F401  (runs the event loop until the thread dies)
+
+    threading.Thread(target=run, daemon=True).start()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        module = sys.modules.get("display")
+        if module and hasattr(module, "main"):
+            return module
+        time.sleep(0.01)
+    raise RuntimeError("display.py did not start")
+
+
+def report(display):
+    """ print every component's stats line """
+    for name in ("boot", "fetcher", "connections", "scheduler", "sampler", "power", "cache", "covers", "view", "views", "glyphs", "layout", "clock",
+                 "touch_input", "governor", "profiler"):
+        component = getattr(display, name, None)
+        if component is not None:
+            print(component.stats())
+    for line in getattr(display, "music_lines", ()):
+        print(line.stats())
+    if display.fetcher is not None:
+        print(display.fetcher.http_cache.stats())
+        print(display.fetcher.health())
+    print(f"touch: last {display.touch_stats['last_ms']} ms max {display.touch_stats['max_ms']} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="run display.py against stand-ins")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--touch", action="append", default=[],
+                        help="seconds,x,y of a tap, e.g. 2.0,150,20")
+    parser.add_argument("--warm", action="store_true", help="start with the RTC already set")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--fail", type=float, default=0.0)
+    parser.add_argument("--reset", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--track-seconds", type=float)
+    args = parser.parse_args(argv)
+
+    server = replay.serve(latency=args.latency, jitter=args.jitter, fail=args.fail,
+                          reset=args.reset, seed=args.seed, track_seconds=args.track_seconds)
+    print(f"flash files in {device_files()}")
+    touches = [tuple(float(v) for v in tap.split(",")) for tap in args.touch]
+    display = start(touches, server, args.warm)
+    time.sleep(args.seconds)
+    print("-" * 20)
+    report(display)
+    print(f"replay: {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+# Host stand-in for supervisor: reload ends the simulated program
+#
+# SPDX-License-Identifier: MIT
+
+
+class _Runtime:
+    serial_bytes_available = 0
+
+
+runtime = _Runtime()
+reloads = 0
+
+
+def reload():
+    global reloads
+    reloads += 1
+    raise SystemExit("supervisor.reload")
@@ -0,0 +1,6 @@
+# Host stand-in for terminalio: the built-in font, always in memory
+#
+# SPDX-License-Identifier: MIT
+from adafruit_bitmap_font.bitmap_font import StandInFont
+
+FONT = StandInFont("terminal6.bdf")
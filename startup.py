@@ -0,0 +1,51 @@
+# Boot stage timing: time to first pixel and to first data
+#
+# SPDX-License-Identifier: MIT
+import time
+
+
+class BootTimer:
+    """ record how long each boot stage took and when the screen first
+    showed something and first showed live data
+
+    Create it as early in code.py as possible; every time is measured from
+    then.  ``stage(name)`` closes the previous stage and opens the next.
+    """
+
+    def __init__(self):
+        self._start = time.monotonic_ns()
+        self._stage_start = self._start
+        self._stage = None
+        self.stages = []  # (name, ms)
+        self.first_pixel_ms = None
+        self.first_data_ms = None
+        self.first_data_source = None
+
+    def _ms(self) -> int:
+        return (time.monotonic_ns() - self._start) // 1000000
+
+    def stage(self, name=None):
+        """ end the current stage and start name (None just ends it) """
+        now = time.monotonic_ns()
+        if self._stage is not None:
+            self.stages.append((self._stage, (now - self._stage_start) // 1000000))
+        self._stage = name
+        self._stage_start = now
+
+    def first_pixel(self):
+        """ the display now shows something """
+        if self.first_pixel_ms is None:
+            self.first_pixel_ms = self._ms()
+
+    def first_data(self, source):
+        """ live data from source is now on screen or ready for it """
+        if self.first_data_ms is None:
+            self.first_data_ms = self._ms()
+            self.first_data_source = source
+            print(self.stats())
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        stages = " ".join(f"{name} {ms}" for name, ms in self.stages)
+        return (f"boot: first pixel {self.first_pixel_ms} ms first data {self.first_data_ms} ms "
+                f"({self.first_data_source}) stages ms: {stages}")
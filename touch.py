@@ -0,0 +1,146 @@
+# Debounced touch sampling, press/release/hold events and region hit-testing
+#
+# SPDX-License-Identifier: MIT
+import time
+
+PRESS = "press"
+RELEASE = "release"
+HOLD = "hold"
+
+
+class RegionMap:
+    """ screen area to region lookup through a coarse grid built once
+
+    Each ``cell`` x ``cell`` block of the screen stores the index of the
+    region covering it, so a hit test is one bytearray read instead of a
+    ``contains()`` call per button.  Regions added later win where they
+    overlap.
+
+        :param width: screen width in pixels
+        :param height: screen height in pixels
+        :param cell: grid resolution in pixels
+    """
+
+    def __init__(self, width, height, cell=8):
+        self.cell = cell
+        self.columns = (width + cell - 1) // cell
+        self.rows = (height + cell - 1) // cell
+        self._cells = bytearray(self.columns * self.rows)  # 0 is no region
+        self._names = [None]
+
+    def add(self, name, x, y, width, height):
+        """ map the rectangle to name """
+        if len(self._names) == 256:
+            raise ValueError("too many regions")
+        self._names.append(name)
+        index = len(self._names) - 1
+        cell = self.cell
+        for row in range(max(y // cell, 0), min((y + height + cell - 1) // cell, self.rows)):
+            start = row * self.columns
+            for column in range(max(x // cell, 0),
+                                min((x + width + cell - 1) // cell, self.columns)):
+                self._cells[start + column] = index
+
+    def add_button(self, name, button):
+        """ map a Button's area to name """
+        self.add(name, button.x, button.y, button.width, button.height)
+
+    def lookup(self, x, y):
+        """ the region name at x, y, or None """
+        column = x // self.cell
+        row = y // self.cell
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            return None
+        return self._names[self._cells[row * self.columns + column]]
+
+
+class TouchInput:
+    """ turn raw touchscreen samples into press, release and hold events
+
+    ``sample()`` is meant to be called at a fixed rate.  A press is only
+    reported after ``debounce`` touched samples in a row, and a release
+    after ``release`` untouched ones, which rides over the odd dropped
+    reading of a resistive panel without blocking while the finger stays
+    down.  Events are ``(kind, region, point, nanoseconds)`` tuples queued
+    for the main loop to drain with ``events()``; the time is that of the
+    first sample of the touch, so handlers can measure their latency.
+
+        :param touchscreen: anything with a ``touch_point`` property
+        :param regions: a RegionMap used to name the pressed region
+        :param debounce: touched samples needed for a press
+        :param release: untouched samples needed for a release
+        :param hold_ms: a touch this long also sends a hold event
+        :param queue_size: events kept before the oldest are dropped
+    """
+
+    def __init__(self, touchscreen, regions, debounce=2, release=3, hold_ms=800,
+                 queue_size=8):
+        self.touchscreen = touchscreen
+        self.regions = regions
+        self.debounce = debounce
+        self.release = release
+        self.hold_ms = hold_ms
+        self.queue_size = queue_size
+        self.point = None  # last debounced touch point
+        self.touching = False  # raw state of the last sample, before debouncing
+        self.samples = 0
+        self.dropped = 0
+        self.max_sample_us = 0
+        self._total_us = 0
+        self._queue = []
+        self._down = False
+        self._held = False
+        self._count = 0  # consecutive samples disagreeing with _down
+        self._start_ns = 0
+        self._region = None
+
+    def _emit(self, kind, now):
+        if len(self._queue) >= self.queue_size:
+            self._queue.pop(0)
+            self.dropped += 1
+        self._queue.append((kind, self._region, self.point, now))
+
+    def sample(self):
+        """ read the touchscreen once and queue any events it completes """
+        now = time.monotonic_ns()
+        touch = self.touchscreen.touch_point
+        self.touching = bool(touch)
+        if self.touching == self._down:
+            self._count = 0
+            if touch:
+                self.point = touch
+                if not self._held and (now - self._start_ns) // 1000000 >= self.hold_ms:
+                    self._held = True
+                    self._emit(HOLD, self._start_ns)
+        else:
+            if self._count == 0 and touch:
+                self._start_ns = now
+            self._count += 1
+            if touch and self._count >= self.debounce:
+                self._down = True
+                self._held = False
+                self._count = 0
+                self.point = touch
+                self._region = self.regions.lookup(touch[0], touch[1])
+                self._emit(PRESS, self._start_ns)
+            elif not touch and self._count >= self.release:
+                self._down = False
+                self._count = 0
+                self._emit(RELEASE, now)
+                self.point = None
+        elapsed_us = (time.monotonic_ns() - now) // 1000
+        self.samples += 1
+        self._total_us += elapsed_us
+        self.max_sample_us = max(self.max_sample_us, elapsed_us)
+
+    def events(self):
+        """ take the queued events, oldest first """
+        queue = self._queue
+        self._queue = []
+        return queue
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        mean_us = self._total_us // self.samples if self.samples else 0
+        return (f"input: {self.samples} samples {mean_us} us mean "
+                f"{self.max_sample_us} us max {self.dropped} dropped")
@@ -0,0 +1,76 @@
+# Tabbed views that stay attached to the display and are shown by unhiding
+#
+# SPDX-License-Identifier: MIT
+import time
+
+
+class ViewManager:
+    """ switch between views by toggling ``hidden`` instead of regrouping
+
+    Removing a group from the root and appending it again makes displayio
+    re-walk the whole subtree; hiding only marks its area dirty.  Every
+    view is appended to ``root`` once, hidden, when it is added.  A view is
+    a group, the tab button that selects it (optional) and an ``on_show``
+    callback that fills it in just before it appears, so new views need no
+    change here.  ``switches`` counts view changes; ``last_us``/``max_us``
+    are the time ``show`` took, callback included.
+
+        :param root: the group the views are attached to
+        :param phase: a perf Phase to record each switch in, or None
+    """
+
+    def __init__(self, root, phase=None):
+        self.root = root
+        self.phase = phase
+        self.current = None
+        self.switches = 0
+        self.last_us = 0
+        self.max_us = 0
+        self._views = {}  # key -> (group, button, on_show)
+        self._order = []
+
+    def add(self, key, group, button=None, on_show=None):
+        """ attach group, hidden, as the view for key """
+        group.hidden = True
+        self.root.append(group)
+        if button is not None:
+            button.selected = True  # "selected" is the greyed out, inactive tab
+        self._views[key] = (group, button, on_show)
+        self._order.append(key)
+
+    @property
+    def keys(self):
+        """ view keys in the order they were added """
+        return self._order
+
+    def show(self, key) -> bool:
+        """ fill in and show the view for key, hiding the current one """
+        if key == self.current:
+            return False
+        start = time.monotonic_ns()
+        if self.phase is not None:
+            self.phase.start()
+        group, button, on_show = self._views[key]
+        if on_show is not None:
+            on_show()
+        if self.current is not None:
+            old_group, old_button, _ = self._views[self.current]
+            old_group.hidden = True
+            if old_button is not None:
+                old_button.selected = True
+        group.hidden = False
+        if button is not None:
+            button.selected = False
+        self.current = key
+        if self.phase is not None:
+            self.phase.stop()
+        self.switches += 1
+        self.last_us = (time.monotonic_ns() - start) // 1000
+        if self.last_us > self.max_us:
+            self.max_us = self.last_us
+        return True
+
+    def stats(self) -> str:
+        """ one line summary for the serial console """
+        return (f"views: {self.switches} switches last {self.last_us} us "
+                f"max {self.max_us} us showing {self.current}")
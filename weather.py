@@ -0,0 +1,8 @@
+# The weather.gov observation fields read by the display and the LAN hub
+#
+# SPDX-License-Identifier: MIT
+
+# the only value read from a weather.gov observation, in celsius
+WEATHER_TEMPERATURE = "properties.temperature.value"
+# the same value in the hub's compact /weather record
+HUB_TEMPERATURE = "temperature"